@@ -0,0 +1,162 @@
+"""This module provides content-addressed storage for screenshots and a cache of the
+Telegram media they were uploaded as."""
+
+import hashlib
+import os
+import re
+import threading
+import time
+
+from config import Config
+from logger_config import logger
+from metrics import metrics
+
+# The media reference cache is pruned of expired entries when it grows beyond this.
+MAX_MEDIA_REFS = 1000
+
+# The names of the files the store writes; other files in the directory are left alone.
+ARTIFACT_NAME = re.compile(r"[0-9a-f]{64}\.\w+")
+
+
+def content_digest(data: bytes) -> str:
+    """Returns the SHA-256 hex digest that identifies an image."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ArtifactStore:
+    """Stores each distinct screenshot once, named after its content hash.
+
+    Identical screenshots of different tasks share one file. Files older than
+    `max_age_seconds` are evicted, and the oldest files are evicted while the
+    stored files take more than `max_bytes`. Only files named after a content hash
+    are managed, so other files in the directory are never deleted. `put` and
+    `evict` may be called from worker threads.
+
+    The store also remembers the Telegram media an image was sent as for
+    `media_ref_ttl` seconds, so that sending the same image again re-uses the
+    uploaded file instead of uploading it once more. Telegram file references
+    expire, which is why the cache is short-lived and in memory only.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_age_seconds: int, media_ref_ttl: int):
+        """Opens (or creates) the artifact directory and evicts expired files.
+
+        Args:
+            directory (str): The directory the screenshots are stored in.
+            max_bytes (int): The maximum total size of the stored files; 0 disables it.
+            max_age_seconds (int): How long files are kept; 0 disables it.
+            media_ref_ttl (int): How long an uploaded file is re-used, in seconds.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.media_ref_ttl = media_ref_ttl
+        self._media_refs: dict[str, tuple[object, float]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # path -> (size, modification time); kept in memory so eviction needs no scan.
+        self._files: dict[str, tuple[int, float]] = {}
+        for entry in os.scandir(directory):
+            if entry.is_file() and ARTIFACT_NAME.fullmatch(entry.name):
+                stat = entry.stat()
+                self._files[entry.path] = (stat.st_size, stat.st_mtime)
+        self.evict()
+
+    def put(self, data: bytes, extension: str) -> str:
+        """Stores an image unless an identical one is already stored.
+
+        Args:
+            data (bytes): The encoded image.
+            extension (str): The file extension, e.g. "png".
+
+        Returns:
+            str: The path of the stored file.
+        """
+        path = os.path.join(self.directory, f"{content_digest(data)}.{extension}")
+        with self._lock:
+            now = time.time()
+            if path in self._files:
+                # Refresh the age of the file, so it is evicted last.
+                os.utime(path, (now, now))
+                metrics.increment("artifacts_deduplicated")
+                logger.debug("Screenshot already stored as %s", path)
+            else:
+                # Written under a temporary name first, so a crash never leaves a truncated
+                # file.
+                with open(f"{path}.tmp", "wb") as image_file:
+                    image_file.write(data)
+                os.replace(f"{path}.tmp", path)
+            self._files[path] = (len(data), now)
+            self._evict()
+        return path
+
+    def evict(self) -> None:
+        """Removes files older than the maximum age, then the oldest files until the
+        stored files are within the size limit."""
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Evicts files as `evict` does; the caller holds the lock."""
+        expired = []
+        if self.max_age_seconds:
+            cutoff = time.time() - self.max_age_seconds
+            expired = [path for path, (_, mtime) in self._files.items() if mtime < cutoff]
+        remaining = sum(size for size, _ in self._files.values())
+        remaining -= sum(self._files[path][0] for path in expired)
+        if self.max_bytes and remaining > self.max_bytes:
+            for path in sorted(self._files, key=lambda path: self._files[path][1]):
+                if remaining <= self.max_bytes:
+                    break
+                if path not in expired:
+                    expired.append(path)
+                    remaining -= self._files[path][0]
+        for path in expired:
+            self._files.pop(path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if expired:
+            metrics.increment("artifacts_evicted", len(expired))
+            logger.info(f"Artifact store: {len(expired)} screenshots evicted.")
+
+    def get_media_ref(self, digest: str):
+        """Returns the Telegram media an image was recently sent as, or None."""
+        entry = self._media_refs.get(digest)
+        if entry is None:
+            return None
+        media, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._media_refs[digest]
+            return None
+        return media
+
+    def remember_media_ref(self, digest: str, media) -> None:
+        """Records the Telegram media an image was sent as."""
+        if len(self._media_refs) >= MAX_MEDIA_REFS:
+            now = time.monotonic()
+            self._media_refs = {
+                key: entry for key, entry in self._media_refs.items() if entry[1] >= now
+            }
+        self._media_refs[digest] = (media, time.monotonic() + self.media_ref_ttl)
+
+    def forget_media_ref(self, digest: str) -> None:
+        """Drops a media reference that Telegram no longer accepts."""
+        self._media_refs.pop(digest, None)
+
+
+_artifact_store: ArtifactStore | None = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Returns the artifact store configured in `Config`, opening it on first use."""
+    global _artifact_store  # pylint: disable=global-statement
+    if _artifact_store is None:
+        _artifact_store = ArtifactStore(
+            Config.ARTIFACT_DIR,
+            Config.ARTIFACT_MAX_MB * 1024 * 1024,
+            Config.ARTIFACT_MAX_AGE_DAYS * 24 * 60 * 60,
+            Config.MEDIA_REF_TTL,
+        )
+    return _artifact_store
@@ -0,0 +1 @@
+"""Benchmarks for the Telegram Job project. Run them from the project root with `uv run python -m benchmarks.<name>`."""
@@ -0,0 +1,63 @@
+"""
+Measures how long a screenshot takes with each capture profile.
+
+Every URL is captured `--runs` times per profile with a warm browser pool, so the
+numbers reflect page loading only, not the Chromium start-up.
+
+Usage: uv run python -m benchmarks.capture_profiles https://www.youtube.com/watch?v=dQw4w9WgXcQ
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from capture_profiles import PROFILES, get_capture_profile
+from config import Config
+from playwrightstuff import BrowserPool
+
+
+async def benchmark(urls: list[str], runs: int) -> dict[str, list[float]]:
+    """Captures every URL with every profile and returns the durations per profile."""
+    pool = BrowserPool(1, max_page_uses=1000, storage_state_path=Config.STORAGE_STATE_PATH)
+    durations: dict[str, list[float]] = {name: [] for name in PROFILES}
+    try:
+        # Warm up the browser, so the first profile does not pay for the launch.
+        await pool.take_screenshot("about:blank", "benchmark_warmup.png")
+        for name in PROFILES:
+            profile = get_capture_profile(name)
+            for url in urls:
+                for run in range(runs):
+                    start = time.perf_counter()
+                    await pool.take_screenshot(url, f"benchmark_{name}_{run}.png", profile)
+                    durations[name].append(time.perf_counter() - start)
+    finally:
+        await pool.close()
+    return durations
+
+
+def report(durations: dict[str, list[float]]) -> None:
+    """Prints the median and mean capture time per profile and the saving against the default."""
+    baseline = statistics.median(durations["default"])
+    print(f"{'profile':<12} {'median s':>9} {'mean s':>9} {'saved s':>9} {'saved %':>8}")
+    for name, values in durations.items():
+        median = statistics.median(values)
+        saved = baseline - median
+        print(
+            f"{name:<12} {median:>9.2f} {statistics.mean(values):>9.2f} "
+            f"{saved:>9.2f} {saved / baseline * 100:>7.0f}%"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture profile benchmark")
+    parser.add_argument("urls", nargs="+", help="The URLs to capture")
+    parser.add_argument("--runs", type=int, default=3, help="Captures per URL and profile")
+    parser.add_argument("--env-file", default=".env", help="Path to the .env file to load")
+    args = parser.parse_args()
+
+    Config.load_env_file(os.path.abspath(args.env_file))
+    Config.init_config()
+    os.makedirs("png", exist_ok=True)
+    report(asyncio.run(benchmark(args.urls, args.runs)))
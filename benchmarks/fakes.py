@@ -0,0 +1,177 @@
+"""
+Local stand-ins for Telegram and the web, used to run the pipeline without network.
+
+`FakeTelegramClient` extends the `RecordedMessagesClient` of `--messages-file` runs
+with `send_file` and simulated latency and FloodWait errors. `PageServer` serves
+HTML pages of a controlled weight from a local HTTP server in a background thread.
+"""
+
+import asyncio
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from telethon import errors
+
+from telegramstuff import RecordedMessagesClient
+
+FILLER = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. "
+
+
+def make_message_texts(
+    count: int, keywords: list[str], job_ratio: float, url_for, seed: int = 42
+) -> list[str]:
+    """
+    Builds a synthetic message stream in which `job_ratio` of the messages are jobs.
+
+    The parser only looks at messages that contain "https://", so job messages
+    mention an https link after the link returned by `url_for`, which is the one
+    the parser picks.
+
+    Args:
+        count (int): The number of messages.
+        keywords (list): The keywords that mark a message as a job.
+        job_ratio (float): The fraction of messages that are jobs (0..1).
+        url_for: A callable returning the link of the n-th job.
+        seed (int, optional): The random seed, so runs are comparable.
+
+    Returns:
+        list: The message texts, oldest first.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for index in range(count):
+        if rng.random() < job_ratio:
+            texts.append(
+                f"**{rng.choice(keywords)} {index + 1}**\n{FILLER * 3}\n"
+                f"{url_for(index)}\n(mirror: https://example.com/{index})"
+            )
+        else:
+            texts.append(FILLER * 3)
+    return texts
+
+
+class FakeTelegramClient(RecordedMessagesClient):
+    """
+    A Telethon client stand-in that serves a fixed message history and records uploads.
+
+    Every batch of 100 fetched messages waits `fetch_latency` seconds. Every
+    `send_file` call waits `send_latency` seconds and fails with a FloodWait error
+    of `flood_wait_seconds` with probability `flood_wait_ratio`.
+    """
+
+    def __init__(
+        self,
+        texts: list[str],
+        fetch_latency: float = 0.0,
+        send_latency: float = 0.0,
+        flood_wait_ratio: float = 0.0,
+        flood_wait_seconds: int = 1,
+        seed: int = 42,
+    ):
+        """Initializes the client with a message history.
+
+        Args:
+            texts (list): The message texts, oldest first; message IDs start at 1.
+            fetch_latency (float): The delay per batch of 100 fetched messages, in seconds.
+            send_latency (float): The delay of every `send_file` call, in seconds.
+            flood_wait_ratio (float): The fraction of `send_file` calls that fail (0..1).
+            flood_wait_seconds (int): The wait a FloodWait error asks for.
+            seed (int): The random seed of the FloodWait errors.
+        """
+        super().__init__(texts)
+        self.fetch_latency = fetch_latency
+        self.send_latency = send_latency
+        self.flood_wait_ratio = flood_wait_ratio
+        self.flood_wait_seconds = flood_wait_seconds
+        self._rng = random.Random(seed)
+        self.sent: list[tuple] = []
+        self.flood_waits = 0
+
+    async def _wait_for_fetch(self) -> None:
+        """Simulates the latency of a history request."""
+        if self.fetch_latency:
+            await asyncio.sleep(self.fetch_latency)
+
+    async def send_file(self, entity, file, caption=None, **_kwargs):
+        """Records an upload; a list of files is sent as an album."""
+        await asyncio.sleep(self.send_latency)
+        if self._rng.random() < self.flood_wait_ratio:
+            self.flood_waits += 1
+            raise errors.FloodWaitError(request=None, capture=self.flood_wait_seconds)
+        files = file if isinstance(file, list) else [file]
+        captions = caption if isinstance(caption, list) else [caption]
+        self.sent.extend((entity, text) for text in captions)
+        messages = [SimpleNamespace(photo=None, document=None) for _ in files]
+        return messages if isinstance(file, list) else messages[0]
+
+
+class PageServer:
+    """
+    Serves pages of a controlled weight on 127.0.0.1.
+
+    `/page/<n>` returns an HTML page of `page_kb` kilobytes of text that references
+    `assets` images of `asset_kb` kilobytes each, served from `/asset/<n>/<i>`.
+    """
+
+    def __init__(self, page_kb: int = 50, assets: int = 5, asset_kb: int = 20):
+        """Initializes the server without starting it."""
+        self.page_kb = page_kb
+        self.assets = assets
+        self.asset_kb = asset_kb
+        self._server: ThreadingHTTPServer | None = None
+
+    def _handler(self):
+        """Returns the request handler class bound to this server's settings."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Serves the generated pages and assets."""
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Answers a page or an asset request."""
+                if self.path.startswith("/asset/"):
+                    # An SVG padded to the asset weight with a comment.
+                    padding = "x" * (server.asset_kb * 1024)
+                    body = (
+                        '<svg xmlns="http://www.w3.org/2000/svg" width="200" height="100">'
+                        f'<rect width="200" height="100" fill="#88c"/><!--{padding}--></svg>'
+                    ).encode()
+                    content_type = "image/svg+xml"
+                else:
+                    page = self.path.rstrip("/").rsplit("/", 1)[-1]
+                    images = "".join(
+                        f'<img src="/asset/{page}/{index}">' for index in range(server.assets)
+                    )
+                    text = (FILLER * (server.page_kb * 1024 // len(FILLER) + 1))[
+                        : server.page_kb * 1024
+                    ]
+                    body = (
+                        f"<html><head><title>Page {page}</title></head>"
+                        f"<body><h1>Page {page}</h1>{images}<p>{text}</p></body></html>"
+                    ).encode()
+                    content_type = "text/html"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_args):
+                """Keeps the benchmark output free of access logs."""
+
+        return Handler
+
+    def start(self) -> str:
+        """Starts the server in a background thread and returns its base URL."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self) -> None:
+        """Stops the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,141 @@
+"""
+Runs the whole pipeline offline and reports throughput, stage latencies and peak memory.
+
+`telegramjob.main` is driven against `FakeTelegramClient`, which serves a synthetic
+message history and simulates upload latency and FloodWait errors, and the job
+links point at pages served by a local `PageServer`. The state database and the
+screenshots go to a temporary directory. With `--no-browser`, a fixed image is
+used instead of Chromium, to measure the parser, queue and upload paths alone.
+
+Usage: uv run python -m benchmarks.load_test --messages 2000 --job-ratio 0.05
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import tempfile
+import time
+
+import telegramjob
+import telegramstuff
+from benchmarks.fakes import FakeTelegramClient, PageServer, make_message_texts
+from config import Config
+from job_journal import JobJournal
+from job_ledger import JobLedger
+from logger_config import logger
+from metrics import metrics
+from routing import Route
+from state_store import StateStore
+
+SOURCE_CHAT_ID = -1001
+DESTINATION_CHAT_ID = -1002
+KEYWORDS = ["Mission", "Aufgabe", "Tätigkeit"]
+
+
+class FixedImagePool:
+    """A browser pool stand-in that returns the same small image for every URL."""
+
+    IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(2048)
+
+    async def take_screenshot(self, _url, _filename, _profile=None) -> bytes:
+        """Returns the fixed image after yielding to the event loop."""
+        await asyncio.sleep(0)
+        return self.IMAGE
+
+    async def close(self) -> None:
+        """Nothing to close."""
+
+
+async def run(args, work_dir: str) -> tuple[float, FakeTelegramClient]:
+    """Runs one pipeline cycle over the synthetic history and returns its duration."""
+    server = PageServer(args.page_kb, args.assets, args.asset_kb)
+    base_url = server.start()
+    texts = make_message_texts(
+        args.messages, KEYWORDS, args.job_ratio, lambda index: f"{base_url}/page/{index}"
+    )
+    client = FakeTelegramClient(
+        texts,
+        fetch_latency=args.fetch_latency,
+        send_latency=args.send_latency,
+        flood_wait_ratio=args.flood_wait_ratio,
+        flood_wait_seconds=args.flood_wait_seconds,
+    )
+
+    # The pipeline reads its collaborators from module globals, as set up in __main__.
+    db_path = os.path.join(work_dir, "state.db")
+    telegramjob.client = client
+    telegramjob.routes = [Route(SOURCE_CHAT_ID, DESTINATION_CHAT_ID, KEYWORDS)]
+    telegramjob.state_store = StateStore(db_path)
+    telegramjob.job_ledger = JobLedger(db_path, 24 * 60 * 60)
+    telegramjob.job_journal = JobJournal(db_path, 24 * 60 * 60)
+    telegramjob.upload_queue = telegramstuff.UploadQueue(
+        client,
+        senders=Config.TELEGRAM_CONCURRENCY,
+        max_size=Config.UPLOAD_QUEUE_SIZE,
+        albums=Config.UPLOAD_ALBUMS,
+    )
+    if args.no_browser:
+        telegramjob.browser_pool = FixedImagePool()
+
+    start = time.perf_counter()
+    try:
+        await telegramjob.main()
+        return time.perf_counter() - start, client
+    finally:
+        await telegramjob.upload_queue.close()
+        if telegramjob.browser_pool is not None:
+            await telegramjob.browser_pool.close()
+        server.stop()
+
+
+def report(duration: float, client: FakeTelegramClient) -> None:
+    """Prints the throughput, the per-stage percentiles, the counters and the peak RSS."""
+    succeeded = metrics.counters.get("jobs_succeeded", 0)
+    print(
+        f"{succeeded} jobs in {duration:.2f} s: {succeeded / duration:.2f} jobs/s, "
+        f"{len(client.sent)} pictures sent, {client.flood_waits} flood waits"
+    )
+    print(f"{'stage':<16} {'count':>6} {'p50 s':>8} {'p95 s':>8}")
+    for stage, histogram in sorted(metrics.histograms.items()):
+        print(
+            f"{stage:<16} {histogram.count:>6} "
+            f"{histogram.percentile(0.5):>8.3f} {histogram.percentile(0.95):>8.3f}"
+        )
+    print("counters: " + " ".join(f"{k}={v}" for k, v in sorted(metrics.counters.items())))
+    # ru_maxrss is in kilobytes on Linux; child processes are only counted once reaped.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"peak RSS: {own:.0f} MB (this process), {children:.0f} MB (largest child)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline pipeline load test")
+    parser.add_argument("--messages", type=int, default=1000, help="Messages in the history")
+    parser.add_argument("--job-ratio", type=float, default=0.05, help="Fraction of jobs")
+    parser.add_argument("--page-kb", type=int, default=50, help="Text weight of each page")
+    parser.add_argument("--assets", type=int, default=5, help="Images per page")
+    parser.add_argument("--asset-kb", type=int, default=20, help="Weight of each image")
+    parser.add_argument("--fetch-latency", type=float, default=0.05, help="Per 100 messages")
+    parser.add_argument("--send-latency", type=float, default=0.2, help="Per send_file call")
+    parser.add_argument("--flood-wait-ratio", type=float, default=0.0)
+    parser.add_argument("--flood-wait-seconds", type=int, default=1)
+    parser.add_argument("--no-browser", action="store_true", help="Skip Chromium")
+    parser.add_argument("--env-file", default=".env", help="Path to the .env file to load")
+    args = parser.parse_args()
+
+    Config.load_env_file(os.path.abspath(args.env_file))
+    # The harness matches its own keywords, so it also runs without a local .env.
+    os.environ["ENV_SPECIFIC_TEXTS"] = ",".join(KEYWORDS)
+    Config.init_config()
+    logger.setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Process the whole history in one cycle, without side effects outside work_dir.
+        Config.MAX_JOBS_PER_CYCLE = 0
+        Config.TELEGRAM_LIMIT = args.messages
+        Config.HEADLESS = True
+        Config.YOUTUBE_ENGAGED = False
+        Config.RESOLVE_SHORT_URLS = False
+        Config.ARTIFACT_DIR = os.path.join(work_dir, "png")
+        report(*asyncio.run(run(args, work_dir)))
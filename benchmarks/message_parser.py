@@ -0,0 +1,92 @@
+"""
+Measures how many messages per second the job extraction handles.
+
+Compares the original per-message implementation (keyword scan, pattern rebuild and
+regex compilation for every message) with the precompiled `JobMatcher` on a
+synthetic message stream.
+
+Usage: uv run python -m benchmarks.message_parser --messages 100000 --keywords 20
+"""
+
+import argparse
+import logging
+import random
+import re
+import time
+
+from config import Config
+from logger_config import logger
+from message_parser import JobMatcher
+
+
+def legacy_extract_jobs(messages):
+    """The extraction loop as it was before `JobMatcher`, kept as the baseline."""
+    extracted_data = []
+    for message_record in messages:
+        message = message_record["text"]
+        if not any(text in message for text in Config.SPECIFIC_TEXTS):
+            continue
+        message = message.replace("**", "")
+        message = message.replace("https**://", "https://")
+        if "https://" not in message:
+            continue
+        specific_texts_pattern = "|".join(re.escape(text) for text in Config.SPECIFIC_TEXTS)
+        task_match = re.search(rf"(?:{specific_texts_pattern})\.?\s*(\d+)", message)
+        link_match = re.search(r"(https?://[^\s]+)", message)
+        if task_match and link_match:
+            extracted_data.append(
+                {
+                    "task_number": task_match.group(1),
+                    "url": link_match.group(1),
+                    "message_id": message_record["id"],
+                }
+            )
+    return extracted_data
+
+
+def make_messages(count: int, keywords: list[str], job_ratio: float) -> list[dict]:
+    """Builds a synthetic message stream in which `job_ratio` of the messages are jobs."""
+    rng = random.Random(42)
+    filler = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3
+    messages = []
+    for message_id in range(count, 0, -1):
+        if rng.random() < job_ratio:
+            text = (
+                f"**{rng.choice(keywords)} {rng.randint(1, 9999)}**\n{filler}\n"
+                f"https://www.youtube.com/watch?v={rng.randint(0, 10**9):x}"
+            )
+        else:
+            text = filler
+        messages.append({"id": message_id, "text": text})
+    return messages
+
+
+def measure(function, messages) -> tuple[float, int]:
+    """Returns the messages per second and the number of jobs found."""
+    start = time.perf_counter()
+    jobs = function(messages)
+    return len(messages) / (time.perf_counter() - start), len(jobs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Message parser benchmark")
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--keywords", type=int, default=20)
+    parser.add_argument("--job-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # Debug logging would dominate the measurement, so it is switched off for both runs.
+    logger.setLevel(logging.WARNING)
+    Config.SPECIFIC_TEXTS = ["Mission", "Aufgabe", "Tätigkeit"] + [
+        f"Keyword{i}" for i in range(max(0, args.keywords - 3))
+    ]
+    messages = make_messages(args.messages, Config.SPECIFIC_TEXTS, args.job_ratio)
+
+    before, before_jobs = measure(legacy_extract_jobs, messages)
+    matcher = JobMatcher(Config.SPECIFIC_TEXTS)
+    after, after_jobs = measure(lambda batch: list(matcher.iter_jobs(batch)), messages)
+    assert before_jobs == after_jobs, "Both implementations must find the same jobs."
+
+    print(f"{len(messages)} messages, {len(Config.SPECIFIC_TEXTS)} keywords, {after_jobs} jobs")
+    print(f"before: {before:>12,.0f} messages/s")
+    print(f"after:  {after:>12,.0f} messages/s ({after / before:.1f}x)")
@@ -0,0 +1,68 @@
+"""
+Measures the cold-start import cost of the entry point with `python -X importtime`.
+
+Every measurement runs in a fresh interpreter. The "eager" run additionally imports
+the heavy modules that `telegramjob.py` used to load at start-up (Playwright, the
+Google API client, coloredlogs), which shows what the lazy imports save on a run
+that finds no jobs.
+
+Usage: uv run python -m benchmarks.startup --runs 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# What a cron run has to import before its first Telegram request.
+LAZY_IMPORTS = "import telegramjob, telethon.sync"
+
+# The same, plus everything that used to be imported eagerly.
+EAGER_IMPORTS = (
+    LAZY_IMPORTS + ", playwright.async_api, playwright.sync_api, "
+    "googleapiclient.discovery, google_auth_oauthlib.flow, coloredlogs"
+)
+
+
+def import_times(statement: str) -> dict[str, int]:
+    """Runs the statement in a fresh interpreter and returns the cumulative import time
+    in microseconds per top-level module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # Format: "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level imports are not indented.
+        if not name.startswith("  "):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def report(label: str, statement: str, runs: int, top: int) -> float:
+    """Prints the median total import time and the slowest modules; returns the median in ms."""
+    samples = [import_times(statement) for _ in range(runs)]
+    totals = [sum(sample.values()) / 1000 for sample in samples]
+    median = statistics.median(totals)
+    print(f"{label}: {median:.0f} ms (median of {runs} runs)")
+    slowest = sorted(samples[-1].items(), key=lambda item: item[1], reverse=True)[:top]
+    for name, cumulative in slowest:
+        print(f"    {cumulative / 1000:>8.1f} ms  {name}")
+    return median
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Start-up import time benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Interpreter starts per measurement")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    lazy = report("lazy (current)", LAZY_IMPORTS, args.runs, args.top)
+    eager = report("eager (previous)", EAGER_IMPORTS, args.runs, args.top)
+    print(f"saved: {eager - lazy:.0f} ms ({(eager - lazy) / eager * 100:.0f}%)")
@@ -1,19 +1,95 @@
 """Configuration settings for the Telegram Job project."""
 
+import asyncio
+import importlib.util
+import logging
 import os
 
 from dotenv import load_dotenv
 
+from job_queue import JOB_ORDERS
 from logger_config import logger  # Import logger
 
+SCREENSHOT_FORMATS = ("png", "jpeg", "webp")
+
+
+def _get_str(key: str, default: str) -> str:
+    """Returns an environment variable as a stripped string."""
+    return os.getenv(key=key, default=default).strip()
+
+
+def _get_int(key: str, default: str) -> int:
+    """Returns an environment variable as an integer."""
+    value = _get_str(key, default)
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{key} must be an integer, got {value!r}") from None
+
+
+def _get_float(key: str, default: str) -> float:
+    """Returns an environment variable as a float."""
+    value = _get_str(key, default)
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{key} must be a number, got {value!r}") from None
+
+
+def _get_bool(key: str, default: str) -> bool:
+    """Returns an environment variable as a boolean; "true", "1" and "yes" are True."""
+    return _get_str(key, default).lower() in ("true", "1", "yes")
+
+
+def _get_list(key: str, default: str = "") -> list[str]:
+    """Returns a comma-separated environment variable as a list of non-empty, stripped items."""
+    return [item.strip() for item in _get_str(key, default).split(",") if item.strip()]
+
+
+def _get_hours(key: str, default: str = "") -> frozenset[int]:
+    """
+    Returns an environment variable in the cron hour syntax, e.g. "9-21" or "7-12,14-22",
+    as the set of hours of the day it covers.
+
+    Ranges include their end hour, as in cron, so "9-21" ends at 21:59, and may wrap
+    around midnight ("22-6"). An empty value covers the whole day.
+    """
+    spec = _get_str(key, default)
+    if not spec:
+        return frozenset(range(24))
+    hours = set()
+    for part in spec.split(","):
+        start, _, end = part.strip().partition("-")
+        try:
+            first, last = int(start), int(end or start)
+        except ValueError:
+            raise ValueError(f"{key} must be hours like 9-21, got {spec!r}") from None
+        if not (0 <= first <= 23 and 0 <= last <= 23):
+            raise ValueError(f"{key} hours must be between 0 and 23, got {spec!r}")
+        hours.add(first)
+        while first != last:
+            first = (first + 1) % 24
+            hours.add(first)
+    return frozenset(hours)
+
 
 class Config:
-    """Stores all configuration settings for the application."""
+    """Stores all configuration settings for the application.
+
+    The settings are read from the environment as a whole, validated, and only
+    then applied, so a reload either replaces all settings or none. Components
+    that precompute state from the settings register with `subscribe` and are
+    notified once per reload with the names of the settings that changed.
+    """
+
+    _listeners: list = []
+    ENV_PATH: str = ".env"
 
     @staticmethod
     def load_env_file(env_path: str = ".env"):
         """Loads environment variables from the specified .env file."""
         logger.info(f"Attempting to load .env file from: {env_path}")
+        Config.ENV_PATH = env_path
         loaded = load_dotenv(dotenv_path=env_path, override=True)
         logger.info(f".env file loaded successfully: {loaded}")
         if not loaded:
@@ -21,44 +97,277 @@ class Config:
                 f"Failed to load .env file from: {env_path}. Check path and permissions."
             )
 
+    @staticmethod
+    def read_env() -> dict:
+        """Reads all settings from the environment variables.
+
+        Returns:
+            dict: The settings, keyed by attribute name.
+
+        Raises:
+            ValueError: If a numeric setting cannot be parsed.
+        """
+        return {
+            "API_ID": _get_int("ENV_API_ID", "0"),
+            "API_HASH": _get_str("ENV_API_HASH", ""),
+            "DESTINATION_CHAT_ID": _get_int("ENV_DESTINATION_CHAT_ID", "0"),
+            "SOURCE_CHAT_ID": _get_int("ENV_SOURCE_CHAT_ID", "0"),
+            "WAIT_MIN": _get_int("ENV_WAIT_MIN", "60"),
+            "WAIT_MAX": _get_int("ENV_WAIT_MAX", "300"),
+            "ACTIVE_HOURS": _get_hours("ENV_ACTIVE_HOURS"),
+            "POLL_INTERVAL": _get_int("ENV_POLL_INTERVAL", "300"),
+            "POLL_JITTER": _get_float("ENV_POLL_JITTER", "0.2"),
+            "TELEGRAM_LIMIT": _get_int("ENV_TELEGRAM_LIMIT", "100"),
+            "STATE_DB_PATH": _get_str("ENV_STATE_DB_PATH", "telegramjob.db"),
+            "LEDGER_TTL_DAYS": _get_int("ENV_LEDGER_TTL_DAYS", "30"),
+            "WORKER_COUNT": _get_int("ENV_WORKER_COUNT", "2"),
+            "MAX_JOBS_PER_CYCLE": _get_int("ENV_MAX_JOBS_PER_CYCLE", "10"),
+            "JOB_ORDER": _get_str("ENV_JOB_ORDER", "newest").lower(),
+            "BACKFILL_BATCH_SIZE": _get_int("ENV_BACKFILL_BATCH_SIZE", "100"),
+            "BACKFILL_CONCURRENCY": _get_int("ENV_BACKFILL_CONCURRENCY", "2"),
+            "BACKFILL_JOBS_PER_MINUTE": _get_float("ENV_BACKFILL_JOBS_PER_MINUTE", "0"),
+            "BACKFILL_BATCH_DELAY": _get_float("ENV_BACKFILL_BATCH_DELAY", "1"),
+            "WORK_QUEUE_DB_PATH": _get_str("ENV_WORK_QUEUE_DB_PATH", ""),
+            "WORK_QUEUE_URL": _get_str("ENV_WORK_QUEUE_URL", ""),
+            "WORK_QUEUE_HOST": _get_str("ENV_WORK_QUEUE_HOST", "127.0.0.1"),
+            "WORK_QUEUE_PORT": _get_int("ENV_WORK_QUEUE_PORT", "0"),
+            "WORK_QUEUE_TOKEN": _get_str("ENV_WORK_QUEUE_TOKEN", ""),
+            "WORK_QUEUE_LEASE_SECONDS": _get_int("ENV_WORK_QUEUE_LEASE_SECONDS", "300"),
+            "WORK_QUEUE_MAX_ATTEMPTS": _get_int("ENV_WORK_QUEUE_MAX_ATTEMPTS", "3"),
+            "WORK_QUEUE_POLL_INTERVAL": _get_float("ENV_WORK_QUEUE_POLL_INTERVAL", "2"),
+            "BROWSER_CONCURRENCY": _get_int("ENV_BROWSER_CONCURRENCY", "2"),
+            "BROWSER_PAGE_MAX_USES": _get_int("ENV_BROWSER_PAGE_MAX_USES", "20"),
+            "PAGE_MAX_HEAP_MB": _get_int("ENV_PAGE_MAX_HEAP_MB", "256"),
+            "CAPTURE_MEMORY_MB": _get_int("ENV_CAPTURE_MEMORY_MB", "200"),
+            "MEMORY_RESERVE_MB": _get_int("ENV_MEMORY_RESERVE_MB", "256"),
+            "MEMORY_REPORT_INTERVAL": _get_int("ENV_MEMORY_REPORT_INTERVAL", "300"),
+            "CAPTURE_PROFILE": _get_str("ENV_CAPTURE_PROFILE", "default"),
+            "CAPTURE_WAIT_SELECTOR": _get_str("ENV_CAPTURE_WAIT_SELECTOR", ""),
+            "CAPTURE_ELEMENT_SELECTOR": _get_str("ENV_CAPTURE_ELEMENT_SELECTOR", ""),
+            "CAPTURE_BLOCK_DOMAINS": _get_list("ENV_CAPTURE_BLOCK_DOMAINS"),
+            "CAPTURE_DEADLINE_MS": _get_int("ENV_CAPTURE_DEADLINE_MS", "0"),
+            "SCREENSHOT_FORMAT": _get_str("ENV_SCREENSHOT_FORMAT", "png")
+            .lower()
+            .replace("jpg", "jpeg"),
+            "SCREENSHOT_QUALITY": _get_int("ENV_SCREENSHOT_QUALITY", "80"),
+            "SCREENSHOT_MAX_WIDTH": _get_int("ENV_SCREENSHOT_MAX_WIDTH", "0"),
+            "SCREENSHOT_SAVE_FILE": _get_bool("ENV_SCREENSHOT_SAVE_FILE", "True"),
+            "ARTIFACT_DIR": _get_str("ENV_ARTIFACT_DIR", "artifacts"),
+            "ARTIFACT_MAX_MB": _get_int("ENV_ARTIFACT_MAX_MB", "500"),
+            "ARTIFACT_MAX_AGE_DAYS": _get_int("ENV_ARTIFACT_MAX_AGE_DAYS", "14"),
+            "MEDIA_REF_TTL": _get_int("ENV_MEDIA_REF_TTL", "3600"),
+            "RENDER_CACHE_TTL": _get_int("ENV_RENDER_CACHE_TTL", "3600"),
+            "RENDER_CACHE_SIZE": _get_int("ENV_RENDER_CACHE_SIZE", "50"),
+            "TELEGRAM_CONCURRENCY": _get_int("ENV_TELEGRAM_CONCURRENCY", "1"),
+            "UPLOAD_QUEUE_SIZE": _get_int("ENV_UPLOAD_QUEUE_SIZE", "20"),
+            "UPLOAD_ALBUMS": _get_bool("ENV_UPLOAD_ALBUMS", "False"),
+            "UPLOAD_MAX_ATTEMPTS": _get_int("ENV_UPLOAD_MAX_ATTEMPTS", "4"),
+            "UPLOAD_BACKOFF_BASE": _get_float("ENV_UPLOAD_BACKOFF_BASE", "2"),
+            "UPLOAD_BACKOFF_MAX": _get_float("ENV_UPLOAD_BACKOFF_MAX", "60"),
+            "UPLOAD_MAX_FLOOD_WAIT": _get_int("ENV_UPLOAD_MAX_FLOOD_WAIT", "300"),
+            "HEADLESS": _get_bool("ENV_HEADLESS", "False"),
+            "YOUTUBE_ENGAGED": _get_bool("ENV_YOUTUBE_ENGAGED", "False"),
+            "TOKEN_PATH": _get_str("ENV_TOKEN_PATH", "token.json"),
+            "CLIENT_SECRETS_FILE": _get_str("ENV_CLIENT_SECRETS_FILE", "client_secret.json"),
+            "STORAGE_STATE_PATH": _get_str("ENV_STORAGE_STATE_PATH", "youtube_state.json"),
+            "SPECIFIC_TEXTS": _get_list("ENV_SPECIFIC_TEXTS"),
+            "URL_TRACKING_PARAMS": [
+                param.lower()
+                for param in _get_list(
+                    "ENV_URL_TRACKING_PARAMS",
+                    "utm_*,si,fbclid,gclid,igshid,feature,ref_src,mc_cid,mc_eid",
+                )
+            ],
+            "RESOLVE_SHORT_URLS": _get_bool("ENV_RESOLVE_SHORT_URLS", "False"),
+            "SHORT_URL_HOSTS": _get_list(
+                "ENV_SHORT_URL_HOSTS", "bit.ly,t.co,tinyurl.com,goo.gl,ow.ly,t.ly,youtu.be"
+            ),
+            "SHORT_URL_CACHE_TTL": _get_int("ENV_SHORT_URL_CACHE_TTL", "86400"),
+            "SHORT_URL_TIMEOUT": _get_float("ENV_SHORT_URL_TIMEOUT", "5"),
+            "ROUTES_FILE": _get_str("ENV_ROUTES_FILE", ""),
+            "LOG_FILE": _get_str("ENV_LOG_FILE", "app.log"),
+            "LOG_LEVEL": _get_str("ENV_LOG_LEVEL", "DEBUG").upper(),
+            "LOG_ASYNC": _get_bool("ENV_LOG_ASYNC", "True"),
+            "LOG_JSON": _get_bool("ENV_LOG_JSON", "False"),
+            "LOG_MAX_BYTES": _get_int("ENV_LOG_MAX_BYTES", "0"),
+            "LOG_BACKUP_COUNT": _get_int("ENV_LOG_BACKUP_COUNT", "5"),
+            "LOG_ROTATE_WHEN": _get_str("ENV_LOG_ROTATE_WHEN", ""),
+            "METRICS_PORT": _get_int("ENV_METRICS_PORT", "0"),
+            "METRICS_FILE": _get_str("ENV_METRICS_FILE", ""),
+            "METRICS_DUMP_INTERVAL": _get_int("ENV_METRICS_DUMP_INTERVAL", "60"),
+            "CONFIG_WATCH_INTERVAL": _get_int("ENV_CONFIG_WATCH_INTERVAL", "10"),
+        }
+
+    @staticmethod
+    def validate(values: dict) -> None:
+        """Checks the settings for invalid values.
+
+        Args:
+            values (dict): The settings as returned by `read_env`.
+
+        Raises:
+            ValueError: Listing every invalid setting.
+        """
+        errors = []
+        if not 0 <= values["WAIT_MIN"] <= values["WAIT_MAX"]:
+            errors.append("ENV_WAIT_MIN must be between 0 and ENV_WAIT_MAX")
+        for key in (
+            "TELEGRAM_LIMIT",
+            "LEDGER_TTL_DAYS",
+            "WORKER_COUNT",
+            "BROWSER_CONCURRENCY",
+            "BROWSER_PAGE_MAX_USES",
+            "TELEGRAM_CONCURRENCY",
+            "UPLOAD_QUEUE_SIZE",
+            "UPLOAD_MAX_ATTEMPTS",
+            "METRICS_DUMP_INTERVAL",
+            "CONFIG_WATCH_INTERVAL",
+            "SHORT_URL_CACHE_TTL",
+            "POLL_INTERVAL",
+            "BACKFILL_BATCH_SIZE",
+            "BACKFILL_CONCURRENCY",
+            "WORK_QUEUE_LEASE_SECONDS",
+            "WORK_QUEUE_MAX_ATTEMPTS",
+        ):
+            if values[key] < 1:
+                errors.append(f"ENV_{key} must be at least 1")
+        for key in (
+            "MAX_JOBS_PER_CYCLE",
+            "CAPTURE_DEADLINE_MS",
+            "SCREENSHOT_MAX_WIDTH",
+            "ARTIFACT_MAX_MB",
+            "ARTIFACT_MAX_AGE_DAYS",
+            "MEDIA_REF_TTL",
+            "RENDER_CACHE_TTL",
+            "RENDER_CACHE_SIZE",
+            "PAGE_MAX_HEAP_MB",
+            "CAPTURE_MEMORY_MB",
+            "MEMORY_RESERVE_MB",
+            "MEMORY_REPORT_INTERVAL",
+            "WORK_QUEUE_PORT",
+        ):
+            if values[key] < 0:
+                errors.append(f"ENV_{key} must not be negative")
+        if not 0 <= values["POLL_JITTER"] < 1:
+            errors.append("ENV_POLL_JITTER must be at least 0 and below 1")
+        for key in ("BACKFILL_JOBS_PER_MINUTE", "BACKFILL_BATCH_DELAY"):
+            if values[key] < 0:
+                errors.append(f"ENV_{key} must not be negative")
+        if not values["ROUTES_FILE"] and not values["SPECIFIC_TEXTS"]:
+            errors.append("ENV_SPECIFIC_TEXTS must list at least one keyword")
+        networked_queue = values["WORK_QUEUE_PORT"] or values["WORK_QUEUE_URL"]
+        if networked_queue and not values["WORK_QUEUE_TOKEN"]:
+            errors.append("ENV_WORK_QUEUE_TOKEN must be set to serve or use the work queue")
+        if values["WORK_QUEUE_POLL_INTERVAL"] <= 0:
+            errors.append("ENV_WORK_QUEUE_POLL_INTERVAL must be positive")
+        if values["SHORT_URL_TIMEOUT"] <= 0:
+            errors.append("ENV_SHORT_URL_TIMEOUT must be positive")
+        if values["JOB_ORDER"] not in JOB_ORDERS:
+            errors.append(f"ENV_JOB_ORDER must be one of {JOB_ORDERS}")
+        # Imported here, as the capture profiles read their overrides from `Config`.
+        from capture_profiles import PROFILES  # pylint: disable=import-outside-toplevel
+
+        if values["CAPTURE_PROFILE"] not in PROFILES:
+            errors.append(f"ENV_CAPTURE_PROFILE must be one of {list(PROFILES)}")
+        if values["SCREENSHOT_FORMAT"] not in SCREENSHOT_FORMATS:
+            errors.append(f"ENV_SCREENSHOT_FORMAT must be one of {SCREENSHOT_FORMATS}")
+        needs_pillow = values["SCREENSHOT_FORMAT"] == "webp" or values["SCREENSHOT_MAX_WIDTH"]
+        if needs_pillow and importlib.util.find_spec("PIL") is None:
+            errors.append(
+                "Pillow must be installed (uv sync --extra images) for ENV_SCREENSHOT_FORMAT=webp "
+                "or ENV_SCREENSHOT_MAX_WIDTH"
+            )
+        if not 1 <= values["SCREENSHOT_QUALITY"] <= 100:
+            errors.append("ENV_SCREENSHOT_QUALITY must be between 1 and 100")
+        if not isinstance(logging.getLevelName(values["LOG_LEVEL"]), int):
+            errors.append(f"ENV_LOG_LEVEL is not a log level: {values['LOG_LEVEL']}")
+        if errors:
+            raise ValueError("Invalid configuration: " + "; ".join(errors))
+
+    @staticmethod
+    def _apply(values: dict) -> set[str]:
+        """Replaces the settings and returns the names of the ones that changed."""
+        changed = {key for key, value in values.items() if getattr(Config, key, None) != value}
+        for key, value in values.items():
+            setattr(Config, key, value)
+        return changed
+
     @staticmethod
     def init_config():
-        """Initializes or re-initializes Config attributes from environment variables."""
-        Config.API_ID = int(os.getenv(key="ENV_API_ID", default="0"))
-        Config.API_HASH = os.getenv(key="ENV_API_HASH", default="")
-        Config.DESTINATION_CHAT_ID = int(
-            os.getenv("ENV_DESTINATION_CHAT_ID", default="0")
-        )
-        Config.SOURCE_CHAT_ID = int(os.getenv("ENV_SOURCE_CHAT_ID", default="0"))
-        Config.WAIT_MIN = int(os.getenv("ENV_WAIT_MIN", default="60"))
-        Config.WAIT_MAX = int(os.getenv("ENV_WAIT_MAX", default="300"))
+        """Initializes or re-initializes Config attributes from environment variables.
+
+        Raises:
+            ValueError: If a setting is invalid.
+        """
+        values = Config.read_env()
+        Config.validate(values)
+        Config._apply(values)
         logger.info(f"WAIT_MAX: {Config.WAIT_MAX}")
-        Config.TELEGRAM_LIMIT = int(os.getenv("ENV_TELEGRAM_LIMIT", default="100"))
-        Config.HEADLESS = (
-            os.getenv(key="ENV_HEADLESS", default="False").lower() == "true"
+        logger.info(f"STATE_DB_PATH: {Config.STATE_DB_PATH}")
+        logger.info(
+            f"WORKER_COUNT: {Config.WORKER_COUNT}, MAX_JOBS_PER_CYCLE: {Config.MAX_JOBS_PER_CYCLE}, "
+            f"JOB_ORDER: {Config.JOB_ORDER}"
         )
-        # Config.AUTH_FILE = os.getenv(key="ENV_AUTH_FILE", default="credentials").lower()
-        Config.YOUTUBE_ENGAGED = bool(os.getenv("ENV_YOUTUBE_ENGAGED", default="false"))
-
-        Config.TOKEN_PATH = os.getenv(key="ENV_TOKEN_PATH", default="token.json")
-        logger.info(f"ENV_TOKEN_PATH: {Config.TOKEN_PATH}")
-
-        Config.CLIENT_SECRETS_FILE = os.getenv(
-            key="ENV_CLIENT_SECRETS_FILE", default="client_secret.json"
+        logger.info(f"CAPTURE_PROFILE: {Config.CAPTURE_PROFILE}")
+        logger.info(
+            f"SCREENSHOT_FORMAT: {Config.SCREENSHOT_FORMAT}, "
+            f"SCREENSHOT_QUALITY: {Config.SCREENSHOT_QUALITY}, "
+            f"SCREENSHOT_MAX_WIDTH: {Config.SCREENSHOT_MAX_WIDTH}"
         )
+        logger.info(f"ENV_TOKEN_PATH: {Config.TOKEN_PATH}")
         logger.info(f"CLIENT_SECRETS_FILE: {Config.CLIENT_SECRETS_FILE}")
-
-        Config.STORAGE_STATE_PATH = os.getenv(
-            key="ENV_STORAGE_STATE_PATH", default="youtube_state.json"
-        )
         logger.info(f"YOUTUBE_ENGAGED: {Config.YOUTUBE_ENGAGED}")
-        Config.SPECIFIC_TEXTS = os.getenv(key="ENV_SPECIFIC_TEXTS", default="").split(
-            ","
-        )
+        logger.info(f"ROUTES_FILE: {Config.ROUTES_FILE}")
         logger.info(
             f"Config initialized. API_ID: {Config.API_ID}, API_HASH: {Config.API_HASH[:5]}..."
         )  # Log first 5 chars of hash
 
+    @staticmethod
+    def subscribe(callback) -> None:
+        """Registers a callable that is notified after each reload that changed something.
+
+        Args:
+            callback: A callable receiving the set of changed setting names.
+        """
+        Config._listeners.append(callback)
+
+    @staticmethod
+    def reload(env_path: str | None = None, also_changed=()) -> set[str]:
+        """
+        Re-reads the .env file and swaps in the new settings if they are valid.
+
+        Invalid settings are logged and the current ones are kept.
+
+        Args:
+            env_path (str, optional): The .env file. Defaults to the file loaded last.
+            also_changed (iterable, optional): Setting names to report as changed even
+                if their value is the same, e.g. "ROUTES_FILE" when the file's content
+                changed.
+
+        Returns:
+            set: The names of the settings that changed.
+        """
+        env_path = env_path or Config.ENV_PATH
+        load_dotenv(dotenv_path=env_path, override=True)
+        try:
+            values = Config.read_env()
+            Config.validate(values)
+        except ValueError as e:
+            logger.error(f"Configuration not reloaded, keeping the current settings: {e}")
+            return set()
+
+        changed = Config._apply(values) | set(also_changed)
+        if not changed:
+            logger.info("Configuration reloaded, nothing changed.")
+            return changed
+        logger.info(f"Configuration reloaded, changed: {sorted(changed)}")
+        for callback in Config._listeners:
+            try:
+                callback(changed)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Error applying the new configuration in {callback}: {e}")
+        return changed
+
     # Initialize with default values, will be updated by init_config()
     API_ID: int = 0
     API_HASH: str = ""
@@ -66,11 +375,108 @@ class Config:
     SOURCE_CHAT_ID: int = 0
     WAIT_MIN: int = 0
     WAIT_MAX: int = 0
+    ACTIVE_HOURS: frozenset[int] = frozenset(range(24))
+    POLL_INTERVAL: int = 300
+    POLL_JITTER: float = 0.0
     TELEGRAM_LIMIT: int = 0
+    STATE_DB_PATH: str = ""
+    LEDGER_TTL_DAYS: int = 0
+    WORKER_COUNT: int = 1
+    MAX_JOBS_PER_CYCLE: int = 0
+    JOB_ORDER: str = "newest"
+    BACKFILL_BATCH_SIZE: int = 100
+    BACKFILL_CONCURRENCY: int = 1
+    BACKFILL_JOBS_PER_MINUTE: float = 0.0
+    BACKFILL_BATCH_DELAY: float = 0.0
+    WORK_QUEUE_DB_PATH: str = ""
+    WORK_QUEUE_URL: str = ""
+    WORK_QUEUE_HOST: str = "127.0.0.1"
+    WORK_QUEUE_PORT: int = 0
+    WORK_QUEUE_TOKEN: str = ""
+    WORK_QUEUE_LEASE_SECONDS: int = 300
+    WORK_QUEUE_MAX_ATTEMPTS: int = 3
+    WORK_QUEUE_POLL_INTERVAL: float = 2.0
+    BROWSER_CONCURRENCY: int = 1
+    BROWSER_PAGE_MAX_USES: int = 0
+    PAGE_MAX_HEAP_MB: int = 0
+    CAPTURE_MEMORY_MB: int = 0
+    MEMORY_RESERVE_MB: int = 0
+    MEMORY_REPORT_INTERVAL: int = 0
+    CAPTURE_PROFILE: str = "default"
+    CAPTURE_WAIT_SELECTOR: str = ""
+    CAPTURE_ELEMENT_SELECTOR: str = ""
+    CAPTURE_BLOCK_DOMAINS: list[str] = []
+    CAPTURE_DEADLINE_MS: int = 0
+    SCREENSHOT_FORMAT: str = "png"
+    SCREENSHOT_QUALITY: int = 80
+    SCREENSHOT_MAX_WIDTH: int = 0
+    SCREENSHOT_SAVE_FILE: bool = True
+    ARTIFACT_DIR: str = "artifacts"
+    ARTIFACT_MAX_MB: int = 0
+    ARTIFACT_MAX_AGE_DAYS: int = 0
+    MEDIA_REF_TTL: int = 0
+    RENDER_CACHE_TTL: int = 0
+    RENDER_CACHE_SIZE: int = 0
+    TELEGRAM_CONCURRENCY: int = 1
+    UPLOAD_QUEUE_SIZE: int = 1
+    UPLOAD_ALBUMS: bool = False
+    UPLOAD_MAX_ATTEMPTS: int = 1
+    UPLOAD_BACKOFF_BASE: float = 0.0
+    UPLOAD_BACKOFF_MAX: float = 0.0
+    UPLOAD_MAX_FLOOD_WAIT: int = 0
     HEADLESS: bool = False
     # AUTH_FILE: str = ""  # New: path to Playwright auth file
     TOKEN_PATH = ""
     CLIENT_SECRETS_FILE = ""
     STORAGE_STATE_PATH = ""
     SPECIFIC_TEXTS: list[str] = []
+    URL_TRACKING_PARAMS: list[str] = []
+    RESOLVE_SHORT_URLS: bool = False
+    SHORT_URL_HOSTS: list[str] = []
+    SHORT_URL_CACHE_TTL: int = 0
+    SHORT_URL_TIMEOUT: float = 0.0
+    ROUTES_FILE: str = ""
+    LOG_FILE: str = "app.log"
+    LOG_LEVEL: str = "DEBUG"
+    LOG_ASYNC: bool = True
+    LOG_JSON: bool = False
+    LOG_MAX_BYTES: int = 0
+    LOG_BACKUP_COUNT: int = 5
+    LOG_ROTATE_WHEN: str = ""
+    METRICS_PORT: int = 0
+    METRICS_FILE: str = ""
+    METRICS_DUMP_INTERVAL: int = 60
+    CONFIG_WATCH_INTERVAL: int = 10
     YOUTUBE_ENGAGED: bool = False
+
+
+def _mtime(path: str) -> float | None:
+    """Returns the modification time of a file, or None if it does not exist."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+async def watch_config(interval: float) -> None:
+    """
+    Reloads the configuration whenever the .env file or the routes file changes.
+
+    Runs until cancelled.
+
+    Args:
+        interval (float): How often the modification times are checked, in seconds.
+    """
+    env_mtime = _mtime(Config.ENV_PATH)
+    routes_mtime = _mtime(Config.ROUTES_FILE) if Config.ROUTES_FILE else None
+    while True:
+        await asyncio.sleep(interval)
+        new_env_mtime = _mtime(Config.ENV_PATH)
+        new_routes_mtime = _mtime(Config.ROUTES_FILE) if Config.ROUTES_FILE else None
+        if new_env_mtime == env_mtime and new_routes_mtime == routes_mtime:
+            continue
+        routes_changed = new_routes_mtime != routes_mtime
+        env_mtime, routes_mtime = new_env_mtime, new_routes_mtime
+        Config.reload(also_changed={"ROUTES_FILE"} if routes_changed else ())
+        # The routes file may have been switched by the reload.
+        routes_mtime = _mtime(Config.ROUTES_FILE) if Config.ROUTES_FILE else None
@@ -0,0 +1,78 @@
+"""
+This module encodes screenshots in the configured output format before they are uploaded.
+
+JPEG at full width is encoded directly by Playwright. WebP output and downscaling
+need Pillow (`uv sync --extra images`), which `Config.validate` requires for these settings.
+"""
+
+from io import BytesIO
+
+from config import SCREENSHOT_FORMATS, Config
+from logger_config import logger
+
+IMAGE_FORMATS = SCREENSHOT_FORMATS
+
+
+def _reencode_with_pillow() -> bool:
+    """Returns True if the screenshot is post-processed with Pillow."""
+    return Config.SCREENSHOT_FORMAT == "webp" or Config.SCREENSHOT_MAX_WIDTH > 0
+
+
+def screenshot_options() -> dict:
+    """Returns the `page.screenshot` options for the configured output.
+
+    Playwright encodes JPEG itself; everything that is post-processed with Pillow
+    is captured as lossless PNG first.
+    """
+    if Config.SCREENSHOT_FORMAT == "jpeg" and not _reencode_with_pillow():
+        return {"type": "jpeg", "quality": Config.SCREENSHOT_QUALITY}
+    return {"type": "png"}
+
+
+def output_format() -> str:
+    """Returns the format screenshots are written in."""
+    return Config.SCREENSHOT_FORMAT
+
+
+def file_extension() -> str:
+    """Returns the file extension for screenshots, without the dot."""
+    return "jpg" if output_format() == "jpeg" else output_format()
+
+
+def encode_screenshot(data: bytes) -> bytes:
+    """
+    Downscales and re-encodes a screenshot as configured.
+
+    Args:
+        data (bytes): The screenshot as returned by `page.screenshot` with `screenshot_options()`.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    if not _reencode_with_pillow():
+        logger.info(f"Screenshot size: {len(data)} bytes ({output_format()})")
+        return data
+
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+
+    with Image.open(BytesIO(data)) as image:
+        max_width = Config.SCREENSHOT_MAX_WIDTH
+        if 0 < max_width < image.width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), Image.Resampling.LANCZOS)
+        output = BytesIO()
+        if Config.SCREENSHOT_FORMAT == "jpeg":
+            image.convert("RGB").save(
+                output, "JPEG", quality=Config.SCREENSHOT_QUALITY, optimize=True
+            )
+        elif Config.SCREENSHOT_FORMAT == "webp":
+            image.save(output, "WEBP", quality=Config.SCREENSHOT_QUALITY)
+        else:
+            image.save(output, "PNG", optimize=True)
+
+    encoded = output.getvalue()
+    logger.info(
+        f"Screenshot encoded as {Config.SCREENSHOT_FORMAT}: {len(data)} -> {len(encoded)} bytes "
+        f"({len(data) / max(1, len(encoded)):.1f}x smaller)"
+    )
+    return encoded
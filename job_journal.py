@@ -0,0 +1,137 @@
+"""This module provides a write-ahead journal of job state transitions, used to resume
+jobs that were interrupted by a crash or restart."""
+
+import json
+import sqlite3
+import time
+
+from job_ledger import EVICTION_INTERVAL, job_key
+from logger_config import logger
+
+# The states a job moves through; "uploaded" and "failed" are final.
+DISCOVERED = "discovered"
+CAPTURED = "captured"
+UPLOADED = "uploaded"
+FAILED = "failed"
+
+
+class JobJournal:
+    """Records each job's state in SQLite before the pipeline moves on.
+
+    A job is journaled as discovered before its screenshot is taken, and as captured,
+    together with the encoded screenshot, before it is queued for upload. Jobs that
+    did not reach a final state are returned by `unfinished`, so they can be resumed
+    on the next start; a captured job is re-uploaded from the journal instead of
+    being rendered again. The screenshot is dropped once the job is final, and final
+    entries are evicted after `ttl_seconds`: when the journal is opened, and at most
+    every `EVICTION_INTERVAL` seconds as jobs reach a final state.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: int):
+        """Opens (or creates) the journal and evicts expired final entries.
+
+        Args:
+            db_path (str): The path to the SQLite database file.
+            ttl_seconds (int): How long final entries are kept for inspection.
+        """
+        self.ttl_seconds = ttl_seconds
+        self._evicted_at = 0.0
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_journal (
+                chat_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                task_number TEXT NOT NULL,
+                url TEXT NOT NULL,
+                job TEXT NOT NULL,
+                state TEXT NOT NULL,
+                filename TEXT,
+                image BLOB,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (chat_id, message_id, task_number, url)
+            )
+            """
+        )
+        self.evict_expired()
+
+    def evict_expired(self) -> None:
+        """Removes final entries older than the TTL."""
+        self._evicted_at = time.monotonic()
+        deleted = self.connection.execute(
+            "DELETE FROM job_journal WHERE state IN (?, ?) AND updated_at < ?",
+            (UPLOADED, FAILED, time.time() - self.ttl_seconds),
+        ).rowcount
+        self.connection.commit()
+        logger.info(f"Job journal: {deleted} expired entries removed.")
+
+    def _update(self, job: dict, state: str, **columns) -> None:
+        """Moves a journaled job to a new state and sets the given columns."""
+        assignments = "".join(f", {column} = ?" for column in columns)
+        self.connection.execute(
+            f"""
+            UPDATE job_journal SET state = ?, updated_at = ?{assignments}
+            WHERE chat_id = ? AND message_id = ? AND task_number = ? AND url = ?
+            """,
+            (state, time.time(), *columns.values(), *job_key(job["source_chat_id"], job)),
+        )
+        self.connection.commit()
+
+    def mark_discovered(self, job: dict) -> None:
+        """Journals a job before it is processed; a job already journaled keeps its state."""
+        self.connection.execute(
+            "INSERT OR IGNORE INTO job_journal (chat_id, message_id, task_number, url, "
+            "job, state, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                *job_key(job["source_chat_id"], job),
+                json.dumps(job, default=str),
+                DISCOVERED,
+                time.time(),
+            ),
+        )
+        self.connection.commit()
+
+    def mark_captured(self, job: dict, filename: str, image: bytes) -> None:
+        """Stores the encoded screenshot of a job until it has been uploaded."""
+        self._update(job, CAPTURED, filename=filename, image=image)
+
+    def mark_uploaded(self, job: dict) -> None:
+        """Records that the job's screenshot was delivered and drops the stored screenshot."""
+        self._update(job, UPLOADED, image=None, error=None)
+        self._evict_if_due()
+
+    def mark_failed(self, job: dict, error: str) -> None:
+        """Records that the job failed and drops the stored screenshot."""
+        self._update(job, FAILED, image=None, error=error)
+        self._evict_if_due()
+
+    def _evict_if_due(self) -> None:
+        """Evicts expired entries if the last eviction is `EVICTION_INTERVAL` seconds ago."""
+        if time.monotonic() - self._evicted_at >= EVICTION_INTERVAL:
+            self.evict_expired()
+
+    def get_capture(self, job: dict) -> tuple[str, bytes] | None:
+        """Returns the stored (filename, screenshot) of a captured job, or None."""
+        row = self.connection.execute(
+            """
+            SELECT filename, image FROM job_journal
+            WHERE chat_id = ? AND message_id = ? AND task_number = ? AND url = ?
+                AND state = ? AND image IS NOT NULL
+            """,
+            (*job_key(job["source_chat_id"], job), CAPTURED),
+        ).fetchone()
+        return row if row else None
+
+    def unfinished(self) -> list[dict]:
+        """Returns the jobs that were discovered or captured but never reached a final
+        state, oldest message first."""
+        rows = self.connection.execute(
+            "SELECT job FROM job_journal WHERE state IN (?, ?) ORDER BY chat_id, message_id",
+            (DISCOVERED, CAPTURED),
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self.connection.close()
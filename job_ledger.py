@@ -0,0 +1,103 @@
+"""This module provides a dedup ledger that remembers which jobs have already been processed."""
+
+import sqlite3
+import time
+
+from logger_config import logger
+from message_parser import normalize_url
+
+# How often expired entries are evicted while the ledger is in use, in seconds.
+EVICTION_INTERVAL = 60 * 60
+
+
+def job_key(chat_id: int, job: dict) -> tuple:
+    """Builds the ledger key of a job.
+
+    Args:
+        chat_id (int): The ID of the source chat the job was posted in.
+        job (dict): A job as yielded by `JobMatcher.iter_jobs`.
+
+    Returns:
+        tuple: (source chat ID, message ID, task number, normalized URL).
+    """
+    return (
+        chat_id,
+        job["message_id"],
+        str(job["task_number"]),
+        normalize_url(job["url"]),
+    )
+
+
+class JobLedger:
+    """Records processed jobs in SQLite, with an in-memory set in front for O(1) lookups.
+
+    Entries older than `ttl_seconds` are evicted when the ledger is opened, and
+    at most every `EVICTION_INTERVAL` seconds as jobs are recorded, so a long-running
+    daemon does not accumulate them.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: int):
+        """Opens (or creates) the ledger and loads the live entries into memory.
+
+        Args:
+            db_path (str): The path to the SQLite database file.
+            ttl_seconds (int): How long a processed job is remembered.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_ledger (
+                chat_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                task_number TEXT NOT NULL,
+                url TEXT NOT NULL,
+                processed_at REAL NOT NULL,
+                PRIMARY KEY (chat_id, message_id, task_number, url)
+            )
+            """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS job_ledger_processed_at ON job_ledger (processed_at)"
+        )
+        self.connection.commit()
+        self._keys: set[tuple] = set()
+        self._evicted_at = 0.0
+        self.evict_expired()
+
+    def evict_expired(self) -> None:
+        """Removes entries older than the TTL and reloads the in-memory set."""
+        self._evicted_at = time.monotonic()
+        cutoff = time.time() - self.ttl_seconds
+        deleted = self.connection.execute(
+            "DELETE FROM job_ledger WHERE processed_at < ?", (cutoff,)
+        ).rowcount
+        self.connection.commit()
+        self._keys = set(
+            self.connection.execute(
+                "SELECT chat_id, message_id, task_number, url FROM job_ledger"
+            )
+        )
+        logger.info(
+            f"Job ledger: {len(self._keys)} entries loaded, {deleted} expired entries removed."
+        )
+
+    def is_processed(self, chat_id: int, job: dict) -> bool:
+        """Returns True if the job has already been processed."""
+        return job_key(chat_id, job) in self._keys
+
+    def mark_processed(self, chat_id: int, job: dict) -> None:
+        """Records the job as processed."""
+        key = job_key(chat_id, job)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO job_ledger VALUES (?, ?, ?, ?, ?)",
+            (*key, time.time()),
+        )
+        self.connection.commit()
+        self._keys.add(key)
+        if time.monotonic() - self._evicted_at >= EVICTION_INTERVAL:
+            self.evict_expired()
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self.connection.close()
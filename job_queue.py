@@ -0,0 +1,87 @@
+"""This module provides a bounded asyncio worker pool that processes jobs from a queue."""
+
+import asyncio
+from contextlib import aclosing
+
+from logger_config import logger
+
+JOB_ORDERS = ("newest", "oldest")
+
+
+class RateLimiter:
+    """Spaces out job starts so that at most `per_minute` jobs start per minute."""
+
+    def __init__(self, per_minute: float):
+        """Initializes the limiter.
+
+        Args:
+            per_minute (float): The maximum number of starts per minute; 0 means no limit.
+        """
+        self.interval = 60 / per_minute if per_minute > 0 else 0.0
+        self._next_start = 0.0
+
+    async def wait(self) -> None:
+        """Waits until the next start is allowed."""
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        # The slot is reserved before sleeping, so concurrent callers queue up in order.
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval
+        await asyncio.sleep(start - now)
+
+
+async def _as_async_iterator(jobs):
+    """Yields the items of a plain iterable asynchronously."""
+    for job in jobs:
+        yield job
+
+
+async def run_job_queue(jobs, handler, worker_count: int, max_jobs: int = 0) -> int:
+    """
+    Processes jobs concurrently with a fixed number of workers.
+
+    Jobs are taken from `jobs` and put on a bounded `asyncio.Queue` that is drained
+    by `worker_count` workers, each awaiting `handler(job)`. Because the queue is
+    bounded, an asynchronous source is only read as fast as the workers keep up:
+    the first job starts while later ones are still being downloaded, and memory
+    use does not grow with the size of the source. An exception raised by the
+    handler is logged and does not stop the other jobs.
+
+    Args:
+        jobs: An iterable or async iterable of jobs, in the order they should be processed.
+        handler: An async callable that processes a single job.
+        worker_count (int): The number of concurrent workers.
+        max_jobs (int, optional): The maximum number of jobs to process; 0 means no limit.
+            Once reached, the source is not read any further. Defaults to 0.
+
+    Returns:
+        int: The number of jobs that were handed to the workers.
+    """
+    worker_count = max(1, worker_count)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=worker_count)
+
+    async def worker(worker_id: int) -> None:
+        """Takes jobs from the queue until it receives the end marker (None)."""
+        while (job := await queue.get()) is not None:
+            try:
+                await handler(job)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Worker {worker_id}: error processing job {job}: {e}")
+
+    source = jobs if hasattr(jobs, "__aiter__") else _as_async_iterator(jobs)
+    workers = [asyncio.create_task(worker(i)) for i in range(worker_count)]
+    count = 0
+    try:
+        async with aclosing(source):
+            async for job in source:
+                await queue.put(job)
+                count += 1
+                if max_jobs > 0 and count >= max_jobs:
+                    logger.warning(f"Per-cycle cap of {max_jobs} jobs reached.")
+                    break
+    finally:
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    return count
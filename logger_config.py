@@ -2,9 +2,74 @@
 This module configures the logging system for the application.
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import sys
-import coloredlogs
+
+LOG_FORMAT = "%(asctime)s-%(levelname)s-%(filename)s-%(funcName)s-%(lineno)d- %(message)s"
+DATE_FORMAT = "%d.%m.%y %H:%M:%S"
+
+# The background writer of the queue-based logging mode, see `configure_logging`.
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "file": record.filename,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RawQueueHandler(logging.handlers.QueueHandler):
+    """Queues records as they are, so they are formatted by the background thread.
+
+    `QueueHandler.prepare` formats the message in the logging thread and drops the
+    exception info, which would leave the JSON lines without their "exception" field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _console_handler(console_level) -> logging.Handler:
+    """Creates the console handler, with colors when attached to a terminal."""
+    # Cron runs have no terminal, so they skip importing coloredlogs altogether.
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(console_level)
+    if sys.stdout.isatty():
+        import coloredlogs  # pylint: disable=import-outside-toplevel
+
+        console_formatter = coloredlogs.ColoredFormatter(
+            fmt=LOG_FORMAT,
+            datefmt=DATE_FORMAT,
+            level_styles={
+                'debug': {'color': 'blue'},
+                'info': {'color': 'green'},
+                'warning': {'color': 'yellow'},
+                'error': {'color': 'red'},
+                'critical': {'color': 'red', 'bold': True},
+            },
+            field_styles={
+                'asctime': {'color': 'white'},
+            }
+        )
+    else:
+        console_formatter = logging.Formatter(fmt=LOG_FORMAT, datefmt=DATE_FORMAT)
+    console_handler.setFormatter(console_formatter)
+    return console_handler
 
 
 def setup_logger(log_file="app.log", console_level=logging.WARNING):
@@ -17,30 +82,10 @@ def setup_logger(log_file="app.log", console_level=logging.WARNING):
     # File handler
     file_handler = logging.FileHandler(log_file)
     file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter(
-        "%(asctime)s-%(levelname)s-%(filename)s-%(funcName)s-%(lineno)d- %(message)s",
-        datefmt="%d.%m.%y %H:%M:%S",
-    )
+    file_formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
     file_handler.setFormatter(file_formatter)
 
-    # Console handler with colors
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(console_level)
-    console_formatter = coloredlogs.ColoredFormatter(
-        fmt="%(asctime)s-%(levelname)s-%(filename)s-%(funcName)s-%(lineno)d- %(message)s",
-        datefmt="%d.%m.%y %H:%M:%S",
-        level_styles={
-            'debug': {'color': 'blue'},
-            'info': {'color': 'green'},
-            'warning': {'color': 'yellow'},
-            'error': {'color': 'red'},
-            'critical': {'color': 'red', 'bold': True},
-        },
-        field_styles={
-            'asctime': {'color': 'white'},
-        }
-    )
-    console_handler.setFormatter(console_formatter)
+    console_handler = _console_handler(console_level)
 
     # Add handlers if not already added
     if not _logger.handlers:
@@ -51,5 +96,83 @@ def setup_logger(log_file="app.log", console_level=logging.WARNING):
     return _logger
 
 
+def configure_logging(
+    log_file="app.log",
+    file_level=logging.DEBUG,
+    console_level=logging.INFO,
+    use_queue=True,
+    json_lines=False,
+    max_bytes=0,
+    backup_count=5,
+    rotate_when="",
+):
+    """
+    Reconfigures the logger once the configuration is known.
+
+    In queue mode, log calls only put the record on an in-memory queue and a
+    background thread does the formatting of the log line and the file and console
+    writes, so logging never blocks the event loop. The logger's level is set to the
+    lowest handler level, so disabled levels are discarded before any formatting.
+
+    Args:
+        log_file (str): The path of the log file.
+        file_level (int): The minimum level written to the log file.
+        console_level (int): The minimum level written to the console.
+        use_queue (bool): Write logs from a background thread.
+        json_lines (bool): Write the log file as JSON lines instead of text.
+        max_bytes (int): Rotate the log file when it reaches this size; 0 disables it.
+        backup_count (int): How many rotated log files are kept.
+        rotate_when (str): Rotate the log file by time instead ("midnight", "H", "D", ...,
+            see `TimedRotatingFileHandler`); empty disables it.
+    """
+    global _listener  # pylint: disable=global-statement
+    stop_logging()
+
+    if rotate_when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when=rotate_when, backupCount=backup_count
+        )
+    elif max_bytes > 0:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count
+        )
+    else:
+        file_handler = logging.FileHandler(log_file)
+    file_handler.setLevel(file_level)
+    if json_lines:
+        file_handler.setFormatter(JsonLinesFormatter(datefmt="%Y-%m-%dT%H:%M:%S"))
+    else:
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+    handlers = [file_handler, _console_handler(console_level)]
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.setLevel(min(file_level, console_level))
+
+    if use_queue:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        logger.addHandler(RawQueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
+
+
+def stop_logging() -> None:
+    """Writes the queued log records and stops the background writer, if running."""
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
 # Initialize the logger (executed once when this module is imported)
 logger = setup_logger(console_level=logging.INFO)
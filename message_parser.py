@@ -1,55 +1,267 @@
 """This module provides functions to parse Telegram messages and extract job-related information."""
 
+import asyncio
 import re
+import time
+import urllib.request
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from config import Config
 from logger_config import logger
+from metrics import metrics
 
+# Characters that end a sentence rather than belong to a link.
+TRAILING_PUNCTUATION = ".,;:!?'\">"
+# Markdown emphasis, which may also be part of a link; stripped only if it wraps the link.
+MARKDOWN_WRAPPERS = "*_"
+# Closing brackets are only stripped if the link does not contain the opening one.
+CLOSING_BRACKETS = {")": "(", "]": "[", "}": "{"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
 
-def extract_jobs_from_messages(messages):
+USER_AGENT = "Mozilla/5.0 (compatible; telegramjob)"
+
+
+def strip_trailing_punctuation(url: str, opening: str = "") -> str:
+    """Removes punctuation and unbalanced closing brackets from the end of a link.
+
+    Args:
+        url (str): The link.
+        opening (str, optional): The character in front of the link in the message. If
+            it is a markdown wrapper ("_" or "*"), the same character closing the link
+            is stripped too; otherwise such characters are kept as part of the link.
+
+    Returns:
+        str: The link without trailing punctuation.
     """
-    Extracts task numbers and links from a list of messages.
+    while url:
+        last = url[-1]
+        if (
+            last in TRAILING_PUNCTUATION
+            or (last in MARKDOWN_WRAPPERS and last == opening)
+            or (last in CLOSING_BRACKETS and url.count(last) > url.count(CLOSING_BRACKETS[last]))
+        ):
+            url = url[:-1]
+        else:
+            break
+    return url
+
+
+def _is_tracking_param(name: str, tracking_params) -> bool:
+    """Returns True if a query parameter is a tracking parameter; "utm_*" matches a prefix."""
+    name = name.lower()
+    return any(
+        name.startswith(param[:-1]) if param.endswith("*") else name == param
+        for param in tracking_params
+    )
+
+
+def normalize_url(url: str) -> str:
+    """
+    Returns a canonical form of a URL, so that equivalent links compare equal.
+
+    Trailing punctuation is stripped, the scheme and host are lower-cased, the
+    default port, a trailing dot of the host and the fragment are dropped, an empty
+    path becomes "/", and the query parameters listed in `Config.URL_TRACKING_PARAMS`
+    are removed. User info ("user:password@") is kept, as it may select what the
+    page shows.
 
     Args:
-        messages (list): A list of strings (messages).
+        url (str): The URL to normalize.
 
     Returns:
-        list: A list of dictionaries, where each dictionary contains
-        the task number and link,
-        or an empty list if no data could be extracted.
+        str: The normalized URL.
+    """
+    parts = urlsplit(strip_trailing_punctuation(url.strip()))
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").rstrip(".")
+    userinfo, _, _ = parts.netloc.rpartition("@")
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    query = parts.query
+    if query and Config.URL_TRACKING_PARAMS:
+        params = parse_qsl(query, keep_blank_values=True)
+        kept = [
+            (name, value)
+            for name, value in params
+            if not _is_tracking_param(name, Config.URL_TRACKING_PARAMS)
+        ]
+        if len(kept) != len(params):
+            query = urlencode(kept)
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+class ShortUrlResolver:
+    """
+    Resolves links of URL shorteners to the link they redirect to.
+
+    The redirect is followed with plain HTTP HEAD requests in a thread, so no
+    page is rendered. Results, including failures, are cached for `ttl_seconds`.
+    """
+
+    def __init__(self, hosts, ttl_seconds: int, timeout: float):
+        """Initializes the resolver with an empty cache.
+
+        Args:
+            hosts (list): The hosts of the URL shorteners to resolve.
+            ttl_seconds (int): How long a resolved link is cached.
+            timeout (float): The timeout of each HEAD request, in seconds.
+        """
+        self.hosts = frozenset(host.lower() for host in hosts)
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self._cache: dict[str, tuple[str, float]] = {}
+
+    def _follow_redirects(self, url: str) -> str:
+        """Returns the final URL after following the redirects of a HEAD request."""
+        request = urllib.request.Request(url, method="HEAD", headers={"User-Agent": USER_AGENT})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.geturl()
+
+    async def resolve(self, url: str) -> str:
+        """
+        Returns the normalized target of a shortened link, or the link itself if it
+        is not shortened or cannot be resolved.
+
+        Args:
+            url (str): A normalized link.
+
+        Returns:
+            str: The normalized target link.
+        """
+        if urlsplit(url).hostname not in self.hosts:
+            return url
+        cached = self._cache.get(url)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        try:
+            with metrics.timer("resolve"):
+                target = normalize_url(await asyncio.to_thread(self._follow_redirects, url))
+            logger.info(f"Resolved {url} to {target}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not resolve {url}: {e}")
+            target = url
+        now = time.monotonic()
+        self._cache = {key: entry for key, entry in self._cache.items() if entry[1] > now}
+        self._cache[url] = (target, now + self.ttl_seconds)
+        return target
+
+
+class JobMatcher:
+    """
+    Extracts jobs from messages using patterns compiled once from the specific texts.
+
+    The keywords are combined into a single alternation, so a message is scanned
+    once for all of them instead of once per keyword.
     """
-    logger.debug("Extracting info from messages...")
-    extracted_data = []
-    for message in messages:
-        if not any(text in message for text in Config.SPECIFIC_TEXTS):
-            logger.debug(f"None of the specific texts found in message: {message}")
-            continue
-
-        logger.debug(f"Processing message: {message}")
+
+    URL_PATTERN = re.compile(r"(https?://[^\s]+)")
+
+    def __init__(self, specific_texts):
+        """Compiles the patterns for the given keywords.
+
+        Args:
+            specific_texts (list): The keywords that mark a message as a job.
+
+        Raises:
+            ValueError: If there is no keyword; an empty pattern would match every message.
+        """
+        self.specific_texts = tuple(text.strip() for text in specific_texts if text.strip())
+        if not self.specific_texts:
+            raise ValueError("At least one specific text is required to match jobs.")
+        specific_texts_pattern = "|".join(re.escape(text) for text in self.specific_texts)
+        self.keyword_pattern = re.compile(specific_texts_pattern)
+        self.task_pattern = re.compile(rf"(?:{specific_texts_pattern})\.?\s*(\d+)")
+
+    def match(self, message: str) -> dict | None:
+        """
+        Extracts the task number and link from a single message text.
+
+        Args:
+            message (str): The message text.
+
+        Returns:
+            dict | None: A dictionary with the task number and link, or None if the
+            message does not contain a job.
+        """
+        if not self.keyword_pattern.search(message):
+            logger.debug("None of the specific texts found in message: %s", message)
+            return None
+
+        logger.debug("Processing message: %s", message)
         message = message.replace("**", "")
-        message = message.replace("https**://", "https://")
 
         if "https://" not in message:
-            logger.debug("'https://' is in the message")
-            continue
+            logger.debug("'https://' is not in the message")
+            return None
 
-        specific_texts_pattern = "|".join(
-            re.escape(text) for text in Config.SPECIFIC_TEXTS
-        )
-        task_match = re.search(
-            rf"(?:{specific_texts_pattern})\.?\s*(\d+)",
-            message,
+        task_match = self.task_pattern.search(message)
+        link_match = self.URL_PATTERN.search(message)
+        if not (task_match and link_match):
+            return None
+        opening = message[link_match.start() - 1] if link_match.start() else ""
+        url = strip_trailing_punctuation(link_match.group(1), opening)
+        return {"task_number": task_match.group(1), "url": normalize_url(url)}
+
+    def iter_jobs(self, messages):
+        """
+        Yields the jobs found in the messages, one at a time.
+
+        Args:
+            messages (iterable): Dictionaries with the message "id" and "text", and
+                optionally its "date".
+
+        Yields:
+            dict: The task number, link, and the ID and date of the message it came from.
+        """
+        for message_record in messages:
+            with metrics.timer("parse"):
+                job = self.match(message_record["text"])
+            if job:
+                job["message_id"] = message_record["id"]
+                job["date"] = message_record.get("date")
+                yield job
+
+    async def aiter_jobs(self, messages):
+        """
+        Yields the jobs found in an asynchronous stream of messages, as the messages arrive.
+
+        Args:
+            messages (async iterable): Dictionaries with the message "id", "text" and "date",
+                e.g. from `telegramstuff.iter_message_records`.
+
+        Yields:
+            dict: The task number, link, and the ID and date of the message it came from.
+        """
+        async for message_record in messages:
+            for job in self.iter_jobs((message_record,)):
+                yield job
+
+
+_url_resolver: ShortUrlResolver | None = None
+
+
+def get_url_resolver() -> ShortUrlResolver:
+    """Returns the resolver for `Config.SHORT_URL_HOSTS`, building it on first use."""
+    global _url_resolver  # pylint: disable=global-statement
+    if _url_resolver is None:
+        _url_resolver = ShortUrlResolver(
+            Config.SHORT_URL_HOSTS, Config.SHORT_URL_CACHE_TTL, Config.SHORT_URL_TIMEOUT
         )
-        link_match = re.search(r"(https?://[^\s]+)", message)
-
-        if task_match and link_match:
-            task_number = task_match.group(1)
-            url = link_match.group(1)
-
-            extracted_data.append(
-                {
-                    "task_number": task_number,
-                    "url": url,
-                }
-            )
-    return extracted_data
+    return _url_resolver
+
+
+def _on_config_change(changed: set[str]) -> None:
+    """Drops the cached resolver when its settings are reloaded."""
+    global _url_resolver  # pylint: disable=global-statement
+    if changed & {"SHORT_URL_HOSTS", "SHORT_URL_CACHE_TTL", "SHORT_URL_TIMEOUT"}:
+        _url_resolver = None
+
+
+Config.subscribe(_on_config_change)
@@ -0,0 +1,180 @@
+"""
+This module provides lightweight in-process metrics: per-stage latency histograms and counters.
+
+Use the module-level `metrics` instance:
+
+    with metrics.timer("page_goto"):
+        await page.goto(url)
+    metrics.increment("jobs_succeeded")
+
+The metrics can be rendered in the Prometheus text format, served over HTTP or
+written to a file, and summarized in one line for cron runs.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from logger_config import logger
+
+# Upper bounds (seconds) of the histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+# How many recent observations per stage are kept for percentiles.
+RECENT_SAMPLES = 1000
+
+PREFIX = "telegramjob"
+
+
+class Histogram:
+    """Cumulative latency buckets plus a window of recent samples for percentiles."""
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: deque = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value: float) -> None:
+        """Records one observation."""
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the given percentile (0..1) of the recent samples, or 0 without samples."""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Metrics:
+    """A registry of counters, gauges and per-stage histograms."""
+
+    def __init__(self):
+        self.counters: dict[str, int] = {}
+        self.gauges: dict[str, float] = {}
+        self.histograms: dict[str, Histogram] = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Increases a counter."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Sets a gauge to its current value."""
+        self.gauges[name] = value
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Records the duration of a stage."""
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Measures the duration of the enclosed block, including awaits, as a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def reset(self) -> None:
+        """Removes all recorded values."""
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+        if self.histograms:
+            lines.append(f"# TYPE {PREFIX}_stage_seconds histogram")
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, histogram.bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else f"{bound:g}"
+                lines.append(
+                    f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}'
+                )
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Returns a one-line summary of the counters and the median time per stage."""
+        counters = " ".join(f"{name}={value}" for name, value in sorted(self.counters.items()))
+        stages = " ".join(
+            f"{stage}={histogram.percentile(0.5):.2f}s/{histogram.count}"
+            for stage, histogram in sorted(self.histograms.items())
+        )
+        return f"{counters or 'no counters'} | {stages or 'no stages'}"
+
+    def dump(self, path: str) -> None:
+        """Writes the metrics in the Prometheus text format to a file."""
+        with open(path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(self.render_prometheus())
+
+
+metrics = Metrics()
+
+
+async def serve_metrics(port: int, host: str = "127.0.0.1"):
+    """
+    Serves the metrics in the Prometheus text format over HTTP.
+
+    Every request, whatever its path, receives the current metrics.
+
+    Args:
+        port (int): The port to listen on.
+        host (str, optional): The address to listen on. Defaults to localhost.
+
+    Returns:
+        asyncio.Server: The running server.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            # Read and discard the request head.
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            body = metrics.render_prometheus().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                + f"Content-Length: {len(body)}\r\n".encode()
+                + b"Connection: close\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Metrics served on http://{host}:{port}/metrics")
+    return server
+
+
+async def dump_metrics_periodically(path: str, interval: float) -> None:
+    """Writes the metrics to a file every `interval` seconds, until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            metrics.dump(path)
+        except OSError as e:
+            logger.error(f"Error writing metrics to {path}: {e}")
@@ -1,17 +1,33 @@
 """
-This module contains the PlaywrightBrowser class which is used to interact with web pages.
+This module contains the BrowserPool, which takes screenshots of web pages with a pool
+of isolated Playwright browser contexts.
 """
 
+import asyncio
+import json
 import os
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
 
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from playwright.async_api import async_playwright
-from playwright.sync_api import sync_playwright
 
+from artifact_store import get_artifact_store
+from capture_profiles import CaptureProfile, get_capture_profile
 from config import Config
+from image_encoding import encode_screenshot, file_extension, screenshot_options
 from logger_config import logger
+from metrics import metrics
+from resources import MB, has_memory_for_capture
 
-headless: bool = Config.HEADLESS
-logger.info(f"headless: {headless}")
+# How often a capture that is held back for lack of memory checks again, in seconds.
+MEMORY_POLL_INTERVAL = 0.5
+
+# The least time left for the screenshot of a page that reached its capture deadline.
+PARTIAL_CAPTURE_MS = 2000
+
+# The JavaScript heap of a page; `performance.memory` is Chromium-only.
+JS_HEAP_SCRIPT = "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
 
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -19,62 +35,337 @@ USER_AGENT = (
     "Chrome/119.0.0.0 Safari/537.36"
 )
 
+BROWSER_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    f"--user-agent={USER_AGENT}",
+]
 
-class PlaywrightBrowser:
-    """A class to manage a Playwright browser instance."""
 
-    def __init__(self):
-        """Initializes the PlaywrightBrowser instance."""
-        self.browser = None
-        self.context = None
-        self.page = None
-        self.playwright = None
+def _is_blocked_host(host: str, domains: tuple) -> bool:
+    """Returns True if the host is one of the domains or a subdomain of one."""
+    return any(host == domain or host.endswith(f".{domain}") for domain in domains)
 
-    async def launch(self):
-        """Launches the browser and creates a new page."""
-        self.playwright = await async_playwright().start()
-        storage_path = "youtube_state.json"
 
-        storage_state = storage_path if os.path.exists(storage_path) else None
-        if storage_state:
-            logger.info(f"Loaded storage state from {storage_path}")
+async def _apply_request_routing(page, profile: CaptureProfile) -> None:
+    """Installs the request routing of a profile, replacing any previous routing."""
+    await page.unroute_all(behavior="ignoreErrors")
+    if not profile.blocks_requests:
+        return
 
-        self.browser = await self.playwright.chromium.launch(
-            headless=Config.HEADLESS,
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                f"--user-agent={USER_AGENT}",
-            ],
+    async def handle_route(route):
+        request = route.request
+        host = urlsplit(request.url).hostname or ""
+        if request.resource_type in profile.block_resource_types or _is_blocked_host(
+            host, profile.block_domains
+        ):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await page.route("**/*", handle_route)
+
+
+async def capture_screenshot(page, url: str, profile: CaptureProfile | None = None) -> bytes:
+    """Opens a URL in the given page and takes a screenshot.
+
+    The page is loaded and captured as described by the capture profile. If the
+    profile's deadline is reached while the page is still loading, the part that
+    has rendered so far is captured instead of failing; that screenshot gets at
+    least `PARTIAL_CAPTURE_MS`, so a capture never runs longer than that past the deadline.
+
+    Args:
+        page: The Playwright page to use.
+        url (str): The URL to take a screenshot of.
+        profile (CaptureProfile, optional): The capture profile. Defaults to the
+            profile selected in `Config`.
+
+    Returns:
+        bytes: The screenshot, encoded as given by `image_encoding.screenshot_options()`.
+    """
+    profile = profile or get_capture_profile()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + profile.deadline_ms / 1000
+
+    def remaining_ms() -> float:
+        # Playwright treats a timeout of 0 as "no timeout", so never go below 1 ms.
+        return max(1.0, (deadline - loop.time()) * 1000)
+
+    await _apply_request_routing(page, profile)
+    try:
+        with metrics.timer("page_goto"):
+            await page.goto(url, wait_until=profile.wait_until, timeout=remaining_ms())
+            if profile.wait_for_selector:
+                await page.wait_for_selector(
+                    profile.wait_for_selector, timeout=remaining_ms()
+                )
+    except PlaywrightTimeoutError:
+        metrics.increment("partial_captures")
+        logger.warning(
+            f"Capture deadline of {profile.deadline_ms} ms reached for {url}, "
+            "taking a partial screenshot."
+        )
+
+    options = screenshot_options()
+    with metrics.timer("screenshot"):
+        if profile.element_selector:
+            try:
+                return await page.locator(profile.element_selector).first.screenshot(
+                    timeout=remaining_ms(), **options
+                )
+            except PlaywrightTimeoutError:
+                logger.warning(
+                    f"Element {profile.element_selector} not found on {url}, "
+                    "taking a page screenshot."
+                )
+        return await page.screenshot(
+            clip=profile.clip,
+            full_page=profile.full_page,
+            timeout=max(PARTIAL_CAPTURE_MS, remaining_ms()),
+            **options,
         )
-        self.context = await self.browser.new_context(storage_state=storage_state)
-        self.page = await self.context.new_page()
 
-    async def close(self):
-        """Closes the browser and the Playwright instance."""
-        if self.context:
+
+async def finish_screenshot(data: bytes, filename: str, save: bool = True) -> bytes:
+    """Encodes a captured screenshot and, if configured, saves it to the artifact store.
+
+    Args:
+        data (bytes): The screenshot as returned by `capture_screenshot`.
+        filename (str): The filename for the screenshot (e.g., "YYMMDD_id.jpg").
+        save (bool, optional): False skips the artifact store, e.g. for dry runs.
+
+    Returns:
+        bytes: The encoded image, ready for upload.
+    """
+    # Re-encoding is CPU-bound, so it runs in a thread to keep the event loop responsive.
+    with metrics.timer("encode"):
+        image = await asyncio.to_thread(encode_screenshot, data)
+    if save and Config.SCREENSHOT_SAVE_FILE:
+        # Writing and evicting files blocks, so it runs in a thread as well.
+        path = await asyncio.to_thread(get_artifact_store().put, image, file_extension())
+        logger.info(f"Screenshot {filename} saved to {path}")
+    return image
+
+
+class _BrowserSlot:
+    """An isolated browser context with a single page, handed out by the BrowserPool."""
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+        self.crashed = False
+        page.on("crash", self._on_crash)
+
+    def _on_crash(self, _page) -> None:
+        """Marks the slot for recycling when its page crashes."""
+        logger.error("Browser page crashed, it will be recycled.")
+        self.crashed = True
+
+    async def close(self) -> None:
+        """Closes the context and its page."""
+        try:
             await self.context.close()
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning(f"Error closing browser context: {e}")
 
-    async def take_screenshot(self, url: str, filename: str) -> None:
-        """Takes a screenshot of a URL and saves it to the png directory.
+
+class BrowserPool:
+    """Shares one Playwright driver and Chromium process between all screenshot jobs.
+
+    Playwright and Chromium are started on first use and kept running until `close`.
+    Each of the `size` slots is an isolated browser context with one page. A slot is
+    recycled after `max_page_uses` screenshots, when its page crashes, when its
+    JavaScript heap grows beyond `Config.PAGE_MAX_HEAP_MB`, or when a capture fails.
+    While a capture is running and the host is short of memory, further captures
+    wait, so the number of captures in flight follows the available memory. The
+    storage state is read from disk only once.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        max_page_uses: int,
+        storage_state_path: str,
+        save_screenshots: bool = True,
+    ):
+        """Initializes the pool without starting the browser.
+
+        Args:
+            size (int): The number of slots, i.e. the number of concurrent captures.
+            max_page_uses (int): How many screenshots a slot takes before it is recycled.
+            storage_state_path (str): The path to the Playwright storage state file.
+            save_screenshots (bool, optional): Save the screenshots to the artifact
+                store (if `Config.SCREENSHOT_SAVE_FILE`). Defaults to True.
+        """
+        self.size = max(1, size)
+        self.max_page_uses = max_page_uses
+        self.storage_state_path = storage_state_path
+        self.save_screenshots = save_screenshots
+        self.playwright = None
+        self.browser = None
+        self._storage_state = None
+        self._slots: asyncio.Queue | None = None
+        self._start_lock = asyncio.Lock()
+        self._in_flight = 0
+
+    async def start(self) -> None:
+        """Starts Playwright and Chromium if they are not running yet."""
+        async with self._start_lock:
+            if self.browser and self.browser.is_connected():
+                return
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+                if os.path.exists(self.storage_state_path):
+                    with open(self.storage_state_path, encoding="utf-8") as state_file:
+                        self._storage_state = json.load(state_file)
+                    logger.info(f"Loaded storage state from {self.storage_state_path}")
+            with metrics.timer("browser_launch"):
+                self.browser = await self.playwright.chromium.launch(
+                    headless=Config.HEADLESS,
+                    args=BROWSER_ARGS,
+                )
+            # Slots are created lazily; None marks a slot without a context yet.
+            self._slots = asyncio.Queue()
+            for _ in range(self.size):
+                self._slots.put_nowait(None)
+            logger.info(f"Browser pool started with {self.size} slots.")
+
+    async def _new_slot(self) -> _BrowserSlot:
+        """Creates a new browser context and page."""
+        with metrics.timer("context_create"):
+            context = await self.browser.new_context(storage_state=self._storage_state)
+            page = await context.new_page()
+        return _BrowserSlot(context, page)
+
+    async def _wait_for_memory(self) -> None:
+        """Holds a capture back while other captures run and memory is short.
+
+        One capture is always allowed, so the pipeline never stalls completely.
+        """
+        held = False
+        while self._in_flight and not has_memory_for_capture():
+            if not held:
+                held = True
+                metrics.increment("captures_held_for_memory")
+                logger.warning(
+                    f"Low memory: holding a capture until one of {self._in_flight} finishes."
+                )
+            await asyncio.sleep(MEMORY_POLL_INTERVAL)
+
+    async def _heap_exceeded(self, slot: _BrowserSlot) -> bool:
+        """Returns True if the slot's page uses more JavaScript heap than allowed."""
+        if not Config.PAGE_MAX_HEAP_MB:
+            return False
+        try:
+            used = await slot.page.evaluate(JS_HEAP_SCRIPT)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.debug(f"Could not read the page heap size, recycling it: {e}")
+            return True
+        if used > Config.PAGE_MAX_HEAP_MB * MB:
+            metrics.increment("pages_recycled_for_memory")
+            logger.info(f"Recycling browser slot with a {used / MB:.0f} MB JavaScript heap.")
+            return True
+        return False
+
+    @asynccontextmanager
+    async def page(self):
+        """Hands out a page for exclusive use, waiting until a slot is free.
+
+        Yields:
+            The Playwright page of the acquired slot.
+        """
+        await self.start()
+        await self._wait_for_memory()
+        slots = self._slots
+        slot = await slots.get()
+        self._in_flight += 1
+        try:
+            if slot is None:
+                slot = await self._new_slot()
+            yield slot.page
+            slot.uses += 1
+            if (
+                slot.crashed
+                or slot.uses >= self.max_page_uses
+                or await self._heap_exceeded(slot)
+            ):
+                logger.debug(f"Recycling browser slot after {slot.uses} uses.")
+                await slot.close()
+                slot = None
+        except BaseException:
+            if slot is not None:
+                await slot.close()
+            slot = None
+            raise
+        finally:
+            self._in_flight -= 1
+            slots.put_nowait(slot)
+
+    async def take_screenshot(
+        self, url: str, filename: str, profile: CaptureProfile | None = None
+    ) -> bytes:
+        """Takes a screenshot of a URL using a pooled page.
+
+        The page is released before the screenshot is encoded, so encoding does
+        not hold up the next capture.
 
         Args:
             url (str): The URL to take a screenshot of.
             filename (str): The desired filename for the screenshot (e.g., "YYMMDD_id.png").
+            profile (CaptureProfile, optional): The capture profile. Defaults to the
+                profile selected in `Config`.
+
+        Returns:
+            bytes: The encoded screenshot.
         """
-        if not self.page:
-            await self.launch()  # Ensure browser and page are launched if not already
-        await self.page.goto(url, timeout=60000)
-        await self.page.screenshot(path=f"./png/{filename}")
-        logger.info(f"Screenshot saved to ./png/{filename}")
+        async with self.page() as page:
+            data = await capture_screenshot(page, url, profile)
+        return await finish_screenshot(data, filename, self.save_screenshots)
+
+    async def resize(self, size: int) -> None:
+        """Changes the number of slots.
+
+        New slots are available immediately. When shrinking, the surplus slots are
+        closed as they are released, so running captures are not interrupted.
+
+        Args:
+            size (int): The new number of slots.
+        """
+        size = max(1, size)
+        if self._slots is None:
+            self.size = size
+            return
+        logger.info(f"Resizing browser pool from {self.size} to {size} slots.")
+        while self.size < size:
+            self._slots.put_nowait(None)
+            self.size += 1
+        while self.size > size:
+            slot = await self._slots.get()
+            self.size -= 1
+            if slot is not None:
+                await slot.close()
+
+    async def close(self) -> None:
+        """Closes all contexts, the browser and the Playwright instance."""
+        if self._slots is not None:
+            while not self._slots.empty():
+                slot = self._slots.get_nowait()
+                if slot is not None:
+                    await slot.close()
+            self._slots = None
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
 
 
 # uv run python3 playwrightstuff.py
 # creates a youtube_state.json if it is not existing
 if __name__ == "__main__":
+    from playwright.sync_api import sync_playwright
+
     storage_path = "youtube_state.json"
     with sync_playwright() as p:
         browser = p.chromium.launch(
@@ -0,0 +1,219 @@
+"""This module provides the asyncio-aware sampling profiler behind `telegramjob.py --profile`.
+
+A background thread samples the Python stacks at a fixed interval. Most of a
+pipeline run is spent awaiting Telegram, Chromium and HTTP requests, where a
+plain profiler only sees the event loop waiting in `select`. So each sample also
+records, for every task that is suspended, the chain of coroutines it is awaiting
+through, which attributes the waiting time to the code that awaits.
+
+The samples are written in the collapsed stack format read by flamegraph.pl,
+inferno and speedscope, and summarized as a table of the hottest functions.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Innermost frames of an event loop that waits for I/O or a timer.
+IDLE_FRAMES = {("selectors.py", "select")}
+
+# Innermost frames of threads that are parked, e.g. idle executor or logging threads.
+PARKED_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("handlers.py", "dequeue"),
+    ("thread.py", "_worker"),
+    ("selectors.py", "select"),
+}
+
+# The root frames of the three kinds of samples.
+LOOP_ROOT = "event loop"
+IDLE_ROOT = "event loop (idle)"
+AWAIT_ROOT = "awaiting"
+
+
+def _frame_name(code) -> str:
+    """Returns the label of a code object, e.g. "telegramjob.py:process_job"."""
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _thread_stack(frame) -> list[str]:
+    """Returns the stack of a thread, outermost frame first."""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _is_leaf(frame, frames: set) -> bool:
+    """Returns True if the innermost frame of a stack is one of the given frames."""
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in frames
+
+
+def _task_stack(task: asyncio.Task) -> list[str] | None:
+    """
+    Returns the await chain of a suspended task, outermost coroutine first, ending
+    with the kind of object it waits for (e.g. "await Future"); None if it is running.
+    """
+    coro = task.get_coro()
+    if getattr(coro, "cr_running", False):
+        return None
+    stack = [f"task {getattr(coro, '__qualname__', type(coro).__name__)}"]
+    awaitable = coro
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            # Awaiting a future goes through its iterator, which hides the future's type.
+            kind = type(awaitable).__name__
+            stack.append(f"await {'Future' if kind == 'FutureIter' else kind}")
+            break
+        stack.append(_frame_name(frame.f_code))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(
+            awaitable, "gi_yieldfrom", None
+        )
+    return stack
+
+
+class SamplingProfiler:
+    """
+    Samples the event loop thread, the suspended tasks and the other threads.
+
+    Every `interval` seconds, the stack of the event loop thread is recorded under
+    "event loop" (or counted as "event loop (idle)" while it waits in `select`), the
+    await chain of each suspended task under "awaiting", and the stack of each busy
+    thread under "thread <name>". Samples are counted per distinct stack.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """Initializes the profiler without starting it.
+
+        Args:
+            interval (float, optional): The time between samples, in seconds.
+        """
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.ticks = 0
+        self.duration = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id = 0
+        self._thread_names: dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Starts sampling; must be called from the thread that runs the event loop."""
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling and waits for the sampling thread to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """Takes samples until stopped."""
+        start = time.perf_counter()
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+            self.ticks += 1
+        self.duration = time.perf_counter() - start
+
+    def _sample(self, own_id: int) -> None:
+        """Records one sample of every thread and every suspended task."""
+        for thread_id, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if thread_id == own_id:
+                continue
+            if thread_id == self._loop_thread_id:
+                if _is_leaf(frame, IDLE_FRAMES):
+                    self.samples[(IDLE_ROOT,)] += 1
+                else:
+                    self.samples[(LOOP_ROOT, *_thread_stack(frame))] += 1
+            elif not _is_leaf(frame, PARKED_FRAMES):
+                if thread_id not in self._thread_names:
+                    self._thread_names = {
+                        thread.ident: thread.name for thread in threading.enumerate()
+                    }
+                root = f"thread {self._thread_names.get(thread_id, thread_id)}"
+                self.samples[(root, *_thread_stack(frame))] += 1
+        try:
+            tasks = asyncio.all_tasks(self._loop)
+        except RuntimeError:
+            # The task set changed while it was copied; the next sample catches up.
+            return
+        for task in tasks:
+            stack = _task_stack(task)
+            if stack:
+                self.samples[(AWAIT_ROOT, *stack)] += 1
+
+    @property
+    def seconds_per_sample(self) -> float:
+        """The measured time between samples, in seconds."""
+        return self.duration / self.ticks if self.ticks else self.interval
+
+    def write_collapsed(self, path: str) -> None:
+        """Writes the samples in the collapsed stack format ("a;b;c count" per line)."""
+        with open(path, "w", encoding="utf-8") as collapsed:
+            for stack, count in sorted(self.samples.items()):
+                collapsed.write(f"{';'.join(stack)} {count}\n")
+
+    def _table(self, title: str, counts: Counter, top: int) -> list[str]:
+        """Formats the `top` entries of a counter as a table of seconds."""
+        lines = [title, f"{'seconds':>9} {'%':>6}  function"]
+        seconds = self.seconds_per_sample
+        for name, count in counts.most_common(top):
+            share = 100 * count / max(1, self.ticks)
+            lines.append(f"{count * seconds:>9.3f} {share:>6.1f}  {name}")
+        return lines + [""]
+
+    def summary(self, top: int = 20) -> str:
+        """
+        Returns a text report of where the run spent its time.
+
+        Time on the event loop thread is listed by function, both inclusive (the
+        function or anything it called was running) and exclusive (the function
+        itself was running). Waiting time is listed by the coroutine and the object
+        it awaited, in task-seconds: two tasks waiting for one second count twice.
+        Percentages are relative to the duration of the run.
+
+        Args:
+            top (int, optional): The number of rows per table.
+        """
+        inclusive, exclusive, waiting, threads = Counter(), Counter(), Counter(), Counter()
+        busy = idle = 0
+        for stack, count in self.samples.items():
+            if stack[0] == IDLE_ROOT:
+                idle += count
+            elif stack[0] == LOOP_ROOT:
+                busy += count
+                exclusive[stack[-1]] += count
+                for name in set(stack[1:]):
+                    inclusive[name] += count
+            elif stack[0] == AWAIT_ROOT:
+                waiting[" -> ".join(stack[-2:])] += count
+            else:
+                threads[f"{stack[0]}: {stack[-1]}"] += count
+        seconds = self.seconds_per_sample
+        lines = [
+            f"Profiled {self.duration:.2f} s, {self.ticks} samples every "
+            f"{seconds * 1000:.1f} ms.",
+            f"Event loop busy {busy * seconds:.2f} s, idle {idle * seconds:.2f} s.",
+            "",
+        ]
+        lines += self._table("Event loop, inclusive:", inclusive, top)
+        lines += self._table("Event loop, exclusive:", exclusive, top)
+        lines += self._table("Awaiting (task-seconds):", waiting, top)
+        if threads:
+            lines += self._table("Other threads, exclusive:", threads, top)
+        return "\n".join(lines)
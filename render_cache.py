@@ -0,0 +1,126 @@
+"""This module provides the render cache, which lets a link that is posted again under a
+new task number re-use its screenshot instead of being rendered once more."""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from capture_profiles import CaptureProfile
+from config import Config
+from logger_config import logger
+from message_parser import normalize_url
+from metrics import metrics
+
+# Settings that change the rendered image, so that cached screenshots no longer apply.
+RENDER_SETTINGS = {
+    "RENDER_CACHE_TTL",
+    "RENDER_CACHE_SIZE",
+    "CAPTURE_PROFILE",
+    "CAPTURE_WAIT_SELECTOR",
+    "CAPTURE_ELEMENT_SELECTOR",
+    "CAPTURE_BLOCK_DOMAINS",
+    "CAPTURE_DEADLINE_MS",
+    "SCREENSHOT_FORMAT",
+    "SCREENSHOT_QUALITY",
+    "SCREENSHOT_MAX_WIDTH",
+}
+
+
+class RenderCache:
+    """
+    Keeps the latest screenshots in memory, keyed by normalized URL and capture profile.
+
+    A screenshot is re-used for `ttl_seconds` after it was taken; beyond `max_entries`,
+    the least recently used one is dropped. Requests for a key that is being rendered
+    wait for that render instead of starting another one. Failed renders are not
+    cached.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        """Initializes an empty cache.
+
+        Args:
+            max_entries (int): The maximum number of cached screenshots.
+            ttl_seconds (int): How long a screenshot is re-used; 0 disables the cache.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple, tuple[bytes, float]] = OrderedDict()
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+
+    async def get_or_render(self, url: str, profile: CaptureProfile, render) -> bytes:
+        """
+        Returns the cached screenshot of a URL, or renders and caches it.
+
+        Args:
+            url (str): The URL.
+            profile (CaptureProfile): The resolved capture profile the screenshot is taken with.
+            render: An async callable without arguments that renders the screenshot.
+
+        Returns:
+            bytes: The encoded screenshot.
+        """
+        if not self.ttl_seconds or not self.max_entries:
+            return await render()
+        # Keyed on every setting of the profile; its repr, as a clip dict is not hashable.
+        key = (normalize_url(url), repr(profile))
+        entry = self._entries.get(key)
+        if entry and entry[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            metrics.increment("render_cache_hits")
+            logger.info(f"Re-using the screenshot of {url} from the render cache.")
+            return entry[0]
+        if key in self._in_flight:
+            metrics.increment("render_cache_coalesced")
+            logger.info(f"Waiting for the screenshot of {url} that is being taken.")
+            # Shielded, so a cancelled waiter does not cancel the render of the others.
+            return await asyncio.shield(self._in_flight[key])
+
+        metrics.increment("render_cache_misses")
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            image = await render()
+        except BaseException as e:
+            future.set_exception(e)
+            # Marks the exception as retrieved if no other request waited for it.
+            future.exception()
+            raise
+        else:
+            future.set_result(image)
+            self._store(key, image)
+            return image
+        finally:
+            del self._in_flight[key]
+
+    def _store(self, key: tuple, image: bytes) -> None:
+        """Caches a screenshot, dropping expired and least recently used ones."""
+        now = time.monotonic()
+        self._entries[key] = (image, now + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        for expired in [k for k, (_, expires) in self._entries.items() if expires <= now]:
+            del self._entries[expired]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# Built on first use by `get_render_cache`, and dropped when its settings are reloaded.
+_render_cache: RenderCache | None = None
+
+
+def get_render_cache() -> RenderCache:
+    """Returns the render cache for the current settings, building it on first use."""
+    global _render_cache  # pylint: disable=global-statement
+    if _render_cache is None:
+        _render_cache = RenderCache(Config.RENDER_CACHE_SIZE, Config.RENDER_CACHE_TTL)
+    return _render_cache
+
+
+def _on_config_change(changed: set[str]) -> None:
+    """Drops the cached screenshots when settings that affect them are reloaded."""
+    global _render_cache  # pylint: disable=global-statement
+    if changed & RENDER_SETTINGS:
+        _render_cache = None
+
+
+Config.subscribe(_on_config_change)
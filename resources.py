@@ -0,0 +1,107 @@
+"""This module measures memory use from /proc, so the pipeline can stay within the
+memory of a small host."""
+
+import asyncio
+import os
+
+from config import Config
+from logger_config import logger
+from metrics import metrics
+
+MB = 1024 * 1024
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def available_memory() -> int | None:
+    """Returns the memory available for new processes in bytes, or None if unknown."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def process_rss(pid: int | str = "self") -> int:
+    """Returns the resident set size of a process in bytes, or 0 if it is gone."""
+    try:
+        with open(f"/proc/{pid}/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def descendant_pids(pid: int) -> list[int]:
+    """Returns the IDs of all child processes of a process, recursively; none without /proc."""
+    try:
+        entries = list(os.scandir("/proc"))
+    except OSError:
+        return []
+    children: dict[int, list[int]] = {}
+    for entry in entries:
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat", encoding="ascii", errors="replace") as stat:
+                # The command name may contain spaces, so fields are counted from its end.
+                parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry.name))
+    descendants = []
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            descendants.append(child)
+            pending.append(child)
+    return descendants
+
+
+def rss_by_component() -> dict[str, int]:
+    """Returns the resident memory of this process ("python") and of all its child
+    processes, i.e. the Playwright driver and Chromium ("browser"), in bytes."""
+    return {
+        "python": process_rss(),
+        "browser": sum(process_rss(pid) for pid in descendant_pids(os.getpid())),
+    }
+
+
+def has_memory_for_capture() -> bool:
+    """
+    Returns True if the host has enough free memory to start another capture.
+
+    A capture is expected to need `Config.CAPTURE_MEMORY_MB`, and
+    `Config.MEMORY_RESERVE_MB` are left for the rest of the system. Without
+    /proc/meminfo, or with `CAPTURE_MEMORY_MB` set to 0, there is no limit.
+    """
+    if not Config.CAPTURE_MEMORY_MB:
+        return True
+    available = available_memory()
+    if available is None:
+        return True
+    return available - Config.MEMORY_RESERVE_MB * MB >= Config.CAPTURE_MEMORY_MB * MB
+
+
+def log_memory_usage() -> None:
+    """Logs the resident memory per component and records it as gauges."""
+    usage = rss_by_component()
+    for component, rss in usage.items():
+        metrics.set_gauge(f"rss_{component}_bytes", rss)
+    available = available_memory()
+    if available is not None:
+        metrics.set_gauge("memory_available_bytes", available)
+    logger.info(
+        "Memory: "
+        + ", ".join(f"{component} {rss / MB:.0f} MB" for component, rss in usage.items())
+        + (f", {available / MB:.0f} MB available" if available is not None else "")
+    )
+
+
+async def report_memory_periodically(interval: float) -> None:
+    """Logs the memory use every `interval` seconds, until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        # Scanning /proc touches one file per process, so it runs in a thread.
+        await asyncio.to_thread(log_memory_usage)
@@ -0,0 +1,108 @@
+"""This module provides the routing table that maps source chats to destination chats."""
+
+import json
+
+from config import Config
+from logger_config import logger
+from message_parser import JobMatcher
+
+
+class Route:
+    """A source chat, the keywords that mark its job messages, and where screenshots are sent."""
+
+    def __init__(
+        self,
+        source_chat_id: int,
+        destination_chat_id: int,
+        specific_texts,
+        poll_interval: int = 0,
+    ):
+        """Initializes the route and compiles its job matcher.
+
+        Args:
+            source_chat_id (int): The ID of the chat to read jobs from.
+            destination_chat_id (int): The ID of the chat to send screenshots to.
+            specific_texts (list): The keywords that mark a message as a job.
+            poll_interval (int, optional): How often the daemon polls the source chat,
+                in seconds; 0 uses `Config.POLL_INTERVAL`.
+        """
+        self.source_chat_id = source_chat_id
+        self.destination_chat_id = destination_chat_id
+        self.poll_interval = poll_interval
+        self.matcher = JobMatcher(specific_texts)
+
+    def __repr__(self) -> str:
+        return (
+            f"Route({self.source_chat_id} -> {self.destination_chat_id}, "
+            f"{list(self.matcher.specific_texts)})"
+        )
+
+    def _add_route(self, job: dict) -> dict:
+        """Adds the source and destination chat IDs to a job."""
+        job["source_chat_id"] = self.source_chat_id
+        job["destination_chat_id"] = self.destination_chat_id
+        return job
+
+    def iter_jobs(self, messages):
+        """Yields the jobs found in the messages, with the route's chat IDs added.
+
+        See `JobMatcher.iter_jobs`.
+        """
+        for job in self.matcher.iter_jobs(messages):
+            yield self._add_route(job)
+
+    async def aiter_jobs(self, messages):
+        """Yields the jobs found in an asynchronous stream of messages, with the route's
+        chat IDs added.
+
+        See `JobMatcher.aiter_jobs`.
+        """
+        async for job in self.matcher.aiter_jobs(messages):
+            yield self._add_route(job)
+
+
+def load_routes() -> list[Route]:
+    """
+    Builds the routing table from the configuration.
+
+    If `Config.ROUTES_FILE` is set, it must contain a JSON list of routes:
+
+        [{"source_chat_id": -100123, "destination_chat_id": 456,
+          "specific_texts": ["Mission", "Aufgabe"]}]
+
+    `specific_texts` is optional and defaults to `Config.SPECIFIC_TEXTS`; the optional
+    `poll_interval` sets how often the daemon polls the source chat. Without a
+    routes file, a single route is built from `SOURCE_CHAT_ID`, `DESTINATION_CHAT_ID`
+    and `SPECIFIC_TEXTS`.
+
+    Returns:
+        list: The routes.
+    """
+    if not Config.ROUTES_FILE:
+        routes = [
+            Route(Config.SOURCE_CHAT_ID, Config.DESTINATION_CHAT_ID, Config.SPECIFIC_TEXTS)
+        ]
+    else:
+        with open(Config.ROUTES_FILE, encoding="utf-8") as routes_file:
+            entries = json.load(routes_file)
+        for entry in entries:
+            texts = entry.get("specific_texts", Config.SPECIFIC_TEXTS)
+            if not any(text.strip() for text in texts):
+                raise ValueError(
+                    f"The route from {entry['source_chat_id']} has no specific texts; "
+                    "set them in the route or in ENV_SPECIFIC_TEXTS."
+                )
+        routes = [
+            Route(
+                int(entry["source_chat_id"]),
+                int(entry["destination_chat_id"]),
+                entry.get("specific_texts", Config.SPECIFIC_TEXTS),
+                int(entry.get("poll_interval", 0)),
+            )
+            for entry in entries
+        ]
+    sources = [route.source_chat_id for route in routes]
+    if len(set(sources)) != len(sources):
+        raise ValueError(f"Each source chat may only appear in one route: {sources}")
+    logger.info(f"Routes: {routes}")
+    return routes
@@ -0,0 +1,102 @@
+"""This module provides the in-process scheduler that polls the source chats in daemon mode,
+replacing the cron schedule and the blocking start delay."""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from config import Config
+from logger_config import logger
+
+# How often the scheduler checks which sources are due, in seconds.
+TICK_SECONDS = 1.0
+
+# Outside the active hours, the scheduler re-checks at least this often, so that
+# reloaded active hours take effect.
+MAX_IDLE_SECONDS = 60.0
+
+
+def seconds_until_active(hours: frozenset[int], now: datetime) -> float:
+    """Returns 0 if `now` is within the active hours, otherwise the seconds until the
+    next active hour starts."""
+    if now.hour in hours:
+        return 0.0
+    start_of_hour = now.replace(minute=0, second=0, microsecond=0)
+    for offset in range(1, 25):
+        candidate = start_of_hour + timedelta(hours=offset)
+        if candidate.hour in hours:
+            return (candidate - now).total_seconds()
+    return 0.0
+
+
+async def random_delay(min_seconds: float, max_seconds: float) -> None:
+    """Waits for a random duration between min_seconds and max_seconds, without
+    blocking the event loop."""
+    delay = random.uniform(min_seconds, max_seconds)
+    logger.info(f"Sleeping for {delay:.0f} seconds...")
+    await asyncio.sleep(delay)
+
+
+class Scheduler:
+    """
+    Runs a coroutine per key at the key's own interval, within the active hours.
+
+    The keys and their intervals are requested on every tick, so keys added or
+    removed by a configuration reload are picked up without a restart. A key is
+    never run twice at the same time; each interval is varied by
+    `Config.POLL_JITTER` so that polls do not happen at fixed times.
+    """
+
+    def __init__(self, get_intervals, callback):
+        """Initializes the scheduler.
+
+        Args:
+            get_intervals: A callable returning a dict of key -> interval in seconds.
+            callback: An async callable that is awaited with a key when it is due.
+        """
+        self.get_intervals = get_intervals
+        self.callback = callback
+        self._next_run: dict = {}
+        self._running: dict[object, asyncio.Task] = {}
+
+    def trigger(self, key) -> None:
+        """Makes a key due now; it runs on the next tick within the active hours, or
+        after its current run has finished."""
+        self._next_run[key] = float("-inf")
+
+    async def _run(self, key) -> None:
+        """Runs the callback for a key, logging its errors."""
+        try:
+            await self.callback(key)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error(f"Scheduled run for {key} failed: {e}")
+
+    def _interval_with_jitter(self, interval: float) -> float:
+        """Returns the interval varied by up to `Config.POLL_JITTER` in either direction."""
+        return interval * random.uniform(1 - Config.POLL_JITTER, 1 + Config.POLL_JITTER)
+
+    async def run(self) -> None:
+        """Runs the due keys until cancelled; all keys are due when it starts."""
+        loop = asyncio.get_running_loop()
+        idle_logged = False
+        try:
+            while True:
+                idle = seconds_until_active(Config.ACTIVE_HOURS, datetime.now())
+                if idle:
+                    if not idle_logged:
+                        logger.info(f"Outside the active hours, next poll in {idle:.0f} s.")
+                        idle_logged = True
+                    await asyncio.sleep(min(idle, MAX_IDLE_SECONDS))
+                    continue
+                idle_logged = False
+                now = loop.time()
+                for key, interval in self.get_intervals().items():
+                    task = self._running.get(key)
+                    if (task and not task.done()) or self._next_run.get(key, now) > now:
+                        continue
+                    self._next_run[key] = now + self._interval_with_jitter(interval)
+                    self._running[key] = asyncio.create_task(self._run(key))
+                await asyncio.sleep(TICK_SECONDS)
+        finally:
+            for task in self._running.values():
+                task.cancel()
@@ -0,0 +1,97 @@
+"""This module provides a small SQLite-backed store for state that must survive between runs."""
+
+import sqlite3
+
+from logger_config import logger
+
+
+class StateStore:
+    """Records the highest processed message ID per source chat (the high-water mark)
+    and the progress of backfills."""
+
+    def __init__(self, db_path: str):
+        """Opens (or creates) the state database.
+
+        Args:
+            db_path (str): The path to the SQLite database file.
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS high_water_marks (
+                chat_id INTEGER PRIMARY KEY,
+                message_id INTEGER NOT NULL,
+                updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+                chat_id INTEGER NOT NULL,
+                since TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (chat_id, since)
+            )
+            """
+        )
+        self.connection.commit()
+        logger.info(f"State store opened: {db_path}")
+
+    def get_last_message_id(self, chat_id: int) -> int:
+        """Returns the highest processed message ID for a chat, or 0 if none was recorded."""
+        row = self.connection.execute(
+            "SELECT message_id FROM high_water_marks WHERE chat_id = ?", (chat_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def set_last_message_id(self, chat_id: int, message_id: int) -> None:
+        """Records a processed message ID for a chat.
+
+        The stored value only ever moves forward, so recording an older ID is a no-op.
+        """
+        self.connection.execute(
+            """
+            INSERT INTO high_water_marks (chat_id, message_id) VALUES (?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET
+                message_id = MAX(message_id, excluded.message_id),
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (chat_id, message_id),
+        )
+        self.connection.commit()
+        logger.debug("High-water mark for %s: %s", chat_id, message_id)
+
+    def get_backfill_checkpoint(self, chat_id: int, since: str) -> int:
+        """Returns the last message ID a backfill of a chat from `since` got to, or 0."""
+        row = self.connection.execute(
+            "SELECT message_id FROM backfill_checkpoints WHERE chat_id = ? AND since = ?",
+            (chat_id, since),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def set_backfill_checkpoint(self, chat_id: int, since: str, message_id: int) -> None:
+        """Records how far a backfill of a chat from `since` got."""
+        self.connection.execute(
+            """
+            INSERT INTO backfill_checkpoints (chat_id, since, message_id) VALUES (?, ?, ?)
+            ON CONFLICT(chat_id, since) DO UPDATE SET
+                message_id = excluded.message_id,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (chat_id, since, message_id),
+        )
+        self.connection.commit()
+
+    def clear_backfill_checkpoint(self, chat_id: int, since: str) -> None:
+        """Removes the checkpoint of a finished backfill."""
+        self.connection.execute(
+            "DELETE FROM backfill_checkpoints WHERE chat_id = ? AND since = ?", (chat_id, since)
+        )
+        self.connection.commit()
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self.connection.close()
@@ -3,101 +3,330 @@ taking screenshots of associated links, and sending them via Telegram.
 """
 
 import argparse  # Added this import
+import asyncio
+import contextlib
+import logging
 import os
-import random
-from datetime import datetime
-from time import sleep
-
-from telethon.sync import TelegramClient
+import signal
+import socket
+import sys
+from datetime import datetime, timezone
 
 import telegramstuff  # type: ignore
 
 # Read the messages from the Telegram channel
-from config import Config
-from logger_config import logger
-from message_parser import extract_jobs_from_messages
-from playwrightstuff import PlaywrightBrowser
-from youtube_api import YouTubeAPI
-
-
-# --- Argument Parsing ---
-# Setup command-line argument parsing to allow for a configurable .env file path.
-parser = argparse.ArgumentParser(description="Telegram Job Scraper")
-parser.add_argument(
-    "--env-file",
-    type=str,
-    default=".env",
-    help="Path to the .env file to load (default: .env)",
-)
-args = parser.parse_args()
-
-# --- Configuration Loading ---
-# Resolve the .env file path to an absolute path to ensure it's found correctly.
-env_file_path = os.path.abspath(args.env_file)
-
-# Load the environment variables from the specified .env file and initialize the configuration.
-Config.load_env_file(env_file_path)
-Config.init_config()
-
-# --- Configuration Variables ---
-# Telegram API credentials
-api_id: int = Config.API_ID
-api_hash: str = Config.API_HASH
-
-# Telegram chat IDs
-destination_chat_id: int = Config.DESTINATION_CHAT_ID
-source_chat_id: int = Config.SOURCE_CHAT_ID
-
-# Script behavior settings
-wait_min: int = Config.WAIT_MIN  # Minimum random sleep time in seconds
-wait_max: int = Config.WAIT_MAX  # Maximum random sleep time in seconds
-telegram_limit: int = Config.TELEGRAM_LIMIT  # Number of messages to fetch
-
-# File paths
-client_secrets_file: str = Config.CLIENT_SECRETS_FILE
-token_path = Config.TOKEN_PATH
-storage_state_path: str = Config.STORAGE_STATE_PATH
-youtube_engaged = Config.YOUTUBE_ENGAGED
-
-
-def random_sleep(min_val: int, max_val: int) -> None:
-    """Pauses execution for a random duration between min_val and max_val seconds."""
-    sleep_time = random.randint(min_val, max_val)
-    logger.info(f"Sleeping for {sleep_time} seconds...")
-    sleep(sleep_time)
-
-
-async def process_job(job, client, destination_chat_id):
+from capture_profiles import get_capture_profile
+from config import Config, watch_config
+from image_encoding import file_extension
+from job_journal import JobJournal
+from job_ledger import JobLedger
+from job_queue import RateLimiter, run_job_queue
+from logger_config import configure_logging, logger
+from message_parser import get_url_resolver
+from metrics import dump_metrics_periodically, metrics, serve_metrics
+from render_cache import get_render_cache
+from resources import log_memory_usage, report_memory_periodically
+from routing import Route, load_routes
+from scheduler import Scheduler, random_delay
+from state_store import StateStore
+from work_queue import SqliteWorkQueue, open_work_queue, serve_work_queue
+
+# Heavy dependencies (Playwright, the Google API client and `telethon.sync`) are
+# imported on the code paths that need them, so a run that finds no jobs never
+# loads them.
+
+# Created on first use by `get_browser_pool`.
+browser_pool = None
+
+# Set by `--dry-run`: nothing is sent, engaged with or saved outside of this process.
+dry_run = False
+
+# With `--role ingestor`, jobs are handed to capture workers through this queue
+# instead of being captured in this process.
+work_queue: SqliteWorkQueue | None = None
+
+# Settings that take effect on reload by rebuilding the routes or the logging setup.
+ROUTE_SETTINGS = {"ROUTES_FILE", "SOURCE_CHAT_ID", "DESTINATION_CHAT_ID", "SPECIFIC_TEXTS"}
+LOG_SETTINGS = {
+    "LOG_FILE",
+    "LOG_LEVEL",
+    "LOG_ASYNC",
+    "LOG_JSON",
+    "LOG_MAX_BYTES",
+    "LOG_BACKUP_COUNT",
+    "LOG_ROTATE_WHEN",
+}
+
+# Tasks started by configuration reloads, kept referenced until they finish.
+reload_tasks = set()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses the command-line arguments.
+
+    Args:
+        argv (list, optional): The arguments to parse. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    # Setup command-line argument parsing to allow for a configurable .env file path.
+    parser = argparse.ArgumentParser(description="Telegram Job Scraper")
+    parser.add_argument(
+        "--env-file",
+        type=str,
+        default=".env",
+        help="Path to the .env file to load (default: .env)",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep the Telegram client connected and process new messages as they arrive",
+    )
+    mode.add_argument(
+        "--backfill",
+        metavar="SINCE",
+        type=parse_since,
+        help="Process the history of the source chats since a message ID or an ISO date "
+        "(e.g. 2024-05-01), in batches, resuming an interrupted backfill",
+    )
+    parser.add_argument(
+        "--role",
+        choices=("all", "ingestor", "worker"),
+        default="all",
+        help="Run the whole pipeline (all, the default), only read Telegram and upload the "
+        "screenshots that workers return (ingestor), or only capture jobs from the work "
+        "queue (worker)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the run and write a flame graph input (.collapsed) and a summary of "
+        "the hottest functions (.txt) next to the log file",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Capture the jobs but do not send them, and keep the state in memory only",
+    )
+    parser.add_argument(
+        "--messages-file",
+        metavar="FILE",
+        help="Read the messages from a JSON file of recorded messages instead of Telegram "
+        "(implies --dry-run)",
+    )
+    args = parser.parse_args(argv)
+    if args.messages_file and args.daemon:
+        parser.error("--messages-file cannot be combined with --daemon")
+    if (args.dry_run or args.messages_file) and args.role != "all":
+        parser.error("--dry-run and --messages-file need --role all")
+    args.dry_run = args.dry_run or bool(args.messages_file)
+    return args
+
+
+def parse_since(value: str) -> int | datetime:
+    """Parses the start of a backfill: a message ID, or an ISO date or time (UTC if no
+    time zone is given).
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is neither.
+    """
+    if value.isdigit():
+        return int(value)
+    try:
+        since = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected a message ID or an ISO date, got {value!r}"
+        ) from None
+    return since if since.tzinfo else since.replace(tzinfo=timezone.utc)
+
+
+def load_config(env_file: str) -> None:
+    """Loads the .env file and initializes the configuration.
+
+    Args:
+        env_file (str): The path to the .env file; relative paths are resolved
+            against the current directory.
+    """
+    Config.load_env_file(os.path.abspath(env_file))
+    Config.init_config()
+    configure_logging_from_config()
+
+
+def configure_logging_from_config() -> None:
+    """Applies the `LOG_*` settings to the logger."""
+    configure_logging(
+        log_file=Config.LOG_FILE,
+        file_level=logging.getLevelName(Config.LOG_LEVEL),
+        use_queue=Config.LOG_ASYNC,
+        json_lines=Config.LOG_JSON,
+        max_bytes=Config.LOG_MAX_BYTES,
+        backup_count=Config.LOG_BACKUP_COUNT,
+        rotate_when=Config.LOG_ROTATE_WHEN,
+    )
+
+
+def get_browser_pool():
+    """Returns the browser pool, creating it (and importing Playwright) on first use."""
+    global browser_pool  # pylint: disable=global-statement
+    if browser_pool is None:
+        from playwrightstuff import BrowserPool  # pylint: disable=import-outside-toplevel
+
+        browser_pool = BrowserPool(
+            Config.BROWSER_CONCURRENCY,
+            Config.BROWSER_PAGE_MAX_USES,
+            Config.STORAGE_STATE_PATH,
+            save_screenshots=not dry_run,
+        )
+    return browser_pool
+
+
+def on_config_change(changed: set[str]) -> None:
+    """
+    Applies a reloaded configuration to the running components.
+
+    Most settings are read from `Config` when they are used and need nothing here.
+    The routes, the logging setup and the size of the browser pool are rebuilt.
+    The Telegram client, the upload queue, the state database and the metrics
+    endpoint keep their settings until the next restart.
+
+    Args:
+        changed (set): The names of the settings that changed.
+    """
+    global routes  # pylint: disable=global-statement
+    if changed & LOG_SETTINGS:
+        configure_logging_from_config()
+    if changed & ROUTE_SETTINGS:
+        try:
+            routes = load_routes()
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Routes not reloaded, keeping the current ones: {e}")
+    if browser_pool is not None:
+        browser_pool.max_page_uses = Config.BROWSER_PAGE_MAX_USES
+        if "BROWSER_CONCURRENCY" in changed:
+            task = asyncio.get_running_loop().create_task(
+                browser_pool.resize(Config.BROWSER_CONCURRENCY)
+            )
+            reload_tasks.add(task)
+            task.add_done_callback(reload_tasks.discard)
+
+
+async def process_job(job, client):
     """
     Processes a single job by taking a screenshot of its URL and sending it to a Telegram chat.
 
-    This function will skip processing if a screenshot for the job already exists.
+    This function will skip processing if the job is already recorded in the job ledger.
+    Each step is recorded in the job journal first; if the journal holds a screenshot
+    of the job from an interrupted run, it is uploaded instead of taking a new one.
+    With `--role ingestor`, the job is put on the work queue for a capture worker
+    instead of being captured here.
 
     Args:
-        job (dict): A dictionary containing job details, including 'url' and 'task_number'.
+        job (dict): A dictionary containing job details, including 'url', 'task_number',
+            and the 'source_chat_id' and 'destination_chat_id' of its route.
         client (TelegramClient): The active Telegram client instance.
-        destination_chat_id (int): The ID of the Telegram chat to send the screenshot to.
     """
     logger.info(f"Processing job: {job}")
-    url = job["url"]
+    metrics.increment("jobs_found")
+    # Shortened links are resolved without a browser, so they share the target's capture.
+    if Config.RESOLVE_SHORT_URLS:
+        job["url"] = await get_url_resolver().resolve(job["url"])
     task_number = job["task_number"]
-    today = datetime.now().strftime("%y%m%d")
-    new_filename = f"{today}_{task_number}.png"
+    source_chat_id = job["source_chat_id"]
+
+    # Avoid re-processing by checking the job ledger.
+    if job_ledger.is_processed(source_chat_id, job):
+        logger.warning(f"Job already processed for task: {task_number}. Skipping.")
+        metrics.increment("jobs_skipped")
+        # Closes a journal entry left open by a crash right after the upload.
+        job_journal.mark_uploaded(job)
+        return
 
-    # Avoid re-processing by checking if the screenshot already exists.
-    if os.path.exists(f"./png/{new_filename}"):
-        logger.warning(
-            f"Screenshot already exists for task: {task_number}. Filename: {new_filename} Skipping."
-        )
+    job_journal.mark_discovered(job)
+    capture = job_journal.get_capture(job)
+    if capture:
+        new_filename, image = capture
+        logger.info(f"Resuming upload of saved screenshot {new_filename} for task: {task_number}")
+        metrics.increment("jobs_resumed")
+    elif work_queue is not None:
+        # A capture worker takes it from here; `collect_results` uploads its screenshot.
+        await work_queue.enqueue(job)
+        metrics.increment("jobs_enqueued")
         return
-    if youtube_engaged:
-        if not client_secrets_file:
+    else:
+        new_filename = screenshot_filename(task_number)
+        try:
+            image = await capture_job(job, new_filename)
+        except Exception as e:
+            job_journal.mark_failed(job, f"capture: {e}")
+            metrics.increment("jobs_failed")
+            raise
+        job_journal.mark_captured(job, new_filename, image)
+    await submit_upload(job, new_filename, image)
+
+
+def screenshot_filename(task_number) -> str:
+    """Returns the filename of a job's screenshot, e.g. "240501_1234.png"."""
+    today = datetime.now().strftime("%y%m%d")
+    return f"{today}_{task_number}.{file_extension()}"
+
+
+async def submit_upload(job, filename: str, image: bytes) -> None:
+    """
+    Queues the screenshot of a captured job for upload to the job's destination chat.
+
+    The job is recorded in the job ledger and the job journal once it is delivered.
+
+    Args:
+        job (dict): The job.
+        filename (str): The filename of the screenshot.
+        image (bytes): The encoded screenshot.
+    """
+
+    async def on_uploaded(sent: bool) -> None:
+        """Records the job once its screenshot has been delivered."""
+        if sent:
+            job_ledger.mark_processed(job["source_chat_id"], job)
+            job_journal.mark_uploaded(job)
+            metrics.increment("jobs_succeeded")
+            logger.info(f"Successfully processed job: {job}")
+        else:
+            job_journal.mark_failed(job, "upload")
+            metrics.increment("jobs_failed")
+            logger.error(f"Failed to send picture for job: {job}")
+
+    # Queue the screenshot for upload; the worker continues with the next job meanwhile.
+    await upload_queue.submit(
+        job["destination_chat_id"], filename, job["task_number"], image, on_uploaded
+    )
+
+
+async def capture_job(job, filename: str) -> bytes:
+    """
+    Engages with the job's YouTube video if enabled, and takes the screenshot, or
+    takes it from the render cache.
+
+    Args:
+        job (dict): The job.
+        filename (str): The filename of the screenshot.
+
+    Returns:
+        bytes: The encoded screenshot.
+    """
+    url = job["url"]
+    # Likes and subscriptions are real side effects, which a dry run must not have.
+    if Config.YOUTUBE_ENGAGED and not dry_run:
+        from youtube_api import YouTubeAPI  # pylint: disable=import-outside-toplevel
+
+        if not Config.CLIENT_SECRETS_FILE:
             raise ValueError(
                 "YouTube client secrets file not found. Please set the path in your .env file."
             )
         scopes = ["https://www.googleapis.com/auth/youtube.force-ssl"]
 
-        youtube_api = YouTubeAPI(client_secrets_file, scopes)
+        youtube_api = YouTubeAPI(Config.CLIENT_SECRETS_FILE, scopes)
 
         # Example URL
         video_url = url
@@ -111,61 +340,556 @@ async def process_job(job, client, destination_chat_id):
             if channel_id:
                 youtube_api.subscribe_to_channel(channel_id)
 
-    logger.info(f"Attempting to take screenshot for URL: {url}")
+    profile = get_capture_profile()
 
-    # Launch a browser, take a screenshot, and ensure the browser is closed.
-    browser = PlaywrightBrowser()
-    try:
-        await browser.launch()
-        await browser.take_screenshot(url, new_filename)
-    finally:
-        await browser.close()
+    async def render() -> bytes:
+        """Takes the screenshot with a pooled page; the pool size bounds browser concurrency."""
+        logger.info(f"Attempting to take screenshot for URL: {url}")
+        with metrics.timer("capture"):
+            return await get_browser_pool().take_screenshot(url, filename, profile)
+
+    # A link posted again under another task number re-uses its recent screenshot.
+    return await get_render_cache().get_or_render(url, profile, render)
+
+
+async def process_jobs(jobs) -> int:
+    """
+    Processes jobs concurrently through the bounded job queue.
+
+    The number of workers and the per-cycle cap are taken from `Config`.
+
+    Args:
+        jobs: An iterable or async iterable of jobs, in the order they should be processed.
+
+    Returns:
+        int: The number of jobs processed.
+    """
+    return await run_job_queue(
+        jobs,
+        lambda job: process_job(job, client),
+        worker_count=Config.WORKER_COUNT,
+        max_jobs=Config.MAX_JOBS_PER_CYCLE,
+    )
+
+
+async def drop_processed(jobs):
+    """
+    Passes on the jobs that are not in the job ledger yet.
+
+    Jobs processed by an earlier run are dropped before they reach the job queue, so
+    they do not count towards the per-cycle cap. Shortened links are resolved first,
+    since the ledger records the resolved link.
+    """
+    async for job in jobs:
+        if Config.RESOLVE_SHORT_URLS:
+            job["url"] = await get_url_resolver().resolve(job["url"])
+        if job_ledger.is_processed(job["source_chat_id"], job):
+            metrics.increment("jobs_skipped")
+            continue
+        yield job
+
+
+async def process_route(route: Route) -> int:
+    """
+    Fetches and processes the new jobs of a single route.
+
+    Up to `Config.TELEGRAM_LIMIT` messages posted in the route's source chat since
+    the last run are fetched. With `Config.JOB_ORDER` "oldest", they are fetched
+    oldest first and streamed through the route's job parser into the job queue, so
+    the first job is processed while later messages are still being downloaded.
+    With "newest", the latest messages are fetched, and their jobs are collected and
+    processed newest first; if more messages were posted than the limit, the older
+    ones are skipped. A route without a last processed message ID starts with its
+    latest messages in either order, instead of with the start of the chat history.
+
+    The last processed message ID only advances past messages whose jobs were all
+    handed to the workers: jobs left over by `Config.MAX_JOBS_PER_CYCLE` are picked
+    up by the next run instead of being skipped.
 
-    # Send the screenshot to the destination chat.
-    if await telegramstuff.send_picture(
-        client, destination_chat_id, new_filename, task_number
-    ):
-        logger.info(f"Successfully processed job: {job}")
+    Args:
+        route (Route): The route to process.
+
+    Returns:
+        int: The number of jobs processed.
+    """
+    # Fetch only the messages newer than the last one processed.
+    last_message_id = state_store.get_last_message_id(route.source_chat_id)
+    highest_message_id = last_message_id
+
+    async def track_highest_id(records):
+        """Passes the records through, remembering the highest message ID consumed."""
+        nonlocal highest_message_id
+        async for record in records:
+            highest_message_id = max(highest_message_id, record["id"])
+            yield record
+
+    # Fetching oldest first from message ID 0 would start at the first message of the
+    # chat, so only a route with a last processed message ID is streamed that way.
+    stream = Config.JOB_ORDER == "oldest" and last_message_id > 0
+    records = telegramstuff.iter_message_records(
+        client,
+        route.source_chat_id,
+        limit=Config.TELEGRAM_LIMIT,
+        min_id=last_message_id,
+        reverse=stream,
+    )
+    jobs = drop_processed(route.aiter_jobs(track_highest_id(records)))
+    if stream:
+        # The cap stops the download, so every message consumed has had its jobs handed out.
+        job_count = await process_jobs(jobs)
     else:
-        logger.error(f"Failed to send picture for job: {job}")
+        # Fetched newest first.
+        window = [job async for job in jobs]
+        if Config.JOB_ORDER == "oldest":
+            window.reverse()
+        cap = Config.MAX_JOBS_PER_CYCLE
+        if cap and len(window) > cap:
+            window, left_over = window[:cap], window[cap:]
+            # Stay below the oldest left-over job, so the next run fetches it again.
+            highest_message_id = min(job["message_id"] for job in left_over) - 1
+            logger.warning(
+                f"Per-cycle cap of {cap} jobs reached; {len(left_over)} jobs "
+                f"from {route.source_chat_id} are left for the next run."
+            )
+        job_count = await process_jobs(window)
+    await upload_queue.join()
+
+    logger.info(f"Processed {job_count} jobs from {route.source_chat_id}.")
+
+    # Remember how far we got, so the next run only fetches newer messages.
+    if highest_message_id > last_message_id:
+        state_store.set_last_message_id(route.source_chat_id, highest_message_id)
+    return job_count
+
+
+async def resume_jobs() -> int:
+    """
+    Processes the jobs that an earlier run left unfinished in the job journal.
+
+    Returns:
+        int: The number of jobs resumed.
+    """
+    jobs = job_journal.unfinished()
+    if not jobs:
+        return 0
+    logger.info(f"Resuming {len(jobs)} unfinished jobs from the job journal.")
+    job_count = await run_job_queue(
+        jobs, lambda job: process_job(job, client), worker_count=Config.WORKER_COUNT
+    )
+    await upload_queue.join()
+    return job_count
 
 
 async def main() -> None:
     """
     Main asynchronous function to run the job scraping and processing workflow.
 
-    This function fetches messages, extracts jobs, and processes the most recent one.
+    Jobs left unfinished by an earlier run are resumed first. Then all routes are
+    processed concurrently over the one Telegram client; the browser pool and the
+    upload queue are shared between them.
+    """
+    await resume_jobs()
+    job_counts = await asyncio.gather(*(process_route(route) for route in routes))
+    if not sum(job_counts):
+        logger.warning("No jobs found in the latest messages.")
+
+
+async def backfill_route(route: Route, since: int | datetime) -> int:
+    """
+    Processes the history of a route's source chat since a message ID or date.
+
+    The history is fetched in batches of `Config.BACKFILL_BATCH_SIZE` messages,
+    oldest first, paging by message ID. Each batch is parsed and its jobs are run
+    by `Config.BACKFILL_CONCURRENCY` workers, started at most
+    `Config.BACKFILL_JOBS_PER_MINUTE` per minute, while the next batch is already
+    being downloaded. After each batch, the last message ID is checkpointed, so an
+    interrupted backfill with the same `since` continues from there.
+
+    Args:
+        route (Route): The route to backfill.
+        since (int | datetime): The message ID after which, or the time since when,
+            messages are processed.
+
+    Returns:
+        int: The number of jobs processed.
+    """
+    chat_id = route.source_chat_id
+    since_key = since.isoformat() if isinstance(since, datetime) else str(since)
+    offset_id = state_store.get_backfill_checkpoint(chat_id, since_key)
+    offset_date = None
+    if offset_id:
+        logger.info(f"Resuming the backfill of {chat_id} after message {offset_id}.")
+    elif isinstance(since, datetime):
+        offset_date = since
+    else:
+        offset_id = since
+    limiter = RateLimiter(Config.BACKFILL_JOBS_PER_MINUTE)
+
+    async def handle(job):
+        """Processes a job once the rate limit allows it."""
+        await limiter.wait()
+        await process_job(job, client)
+
+    async def fetch(offset_id, offset_date, delay):
+        """Fetches a batch after a pause that keeps history requests below flood limits."""
+        await asyncio.sleep(delay)
+        return await telegramstuff.fetch_history_batch(
+            client, chat_id, Config.BACKFILL_BATCH_SIZE, offset_id, offset_date
+        )
+
+    job_count = 0
+    next_batch = asyncio.create_task(fetch(offset_id, offset_date, 0))
+    try:
+        while True:
+            records, last_id = await next_batch
+            if last_id == offset_id:
+                break
+            offset_id = last_id
+            # The next batch is downloaded while this one is processed.
+            next_batch = asyncio.create_task(fetch(offset_id, None, Config.BACKFILL_BATCH_DELAY))
+            job_count += await run_job_queue(
+                route.iter_jobs(records), handle, worker_count=Config.BACKFILL_CONCURRENCY
+            )
+            await upload_queue.join()
+            state_store.set_backfill_checkpoint(chat_id, since_key, offset_id)
+            state_store.set_last_message_id(chat_id, offset_id)
+            logger.info(f"Backfill of {chat_id}: {job_count} jobs up to message {offset_id}.")
+    finally:
+        next_batch.cancel()
+    state_store.clear_backfill_checkpoint(chat_id, since_key)
+    logger.info(f"Backfill of {chat_id} finished: {job_count} jobs.")
+    return job_count
+
+
+async def run_backfill(since: int | datetime) -> None:
+    """
+    Processes the history of all routes since a message ID or date, concurrently.
+
+    Jobs left unfinished by an earlier run are resumed first.
+
+    Args:
+        since (int | datetime): See `backfill_route`.
+    """
+    await resume_jobs()
+    job_counts = await asyncio.gather(*(backfill_route(route, since) for route in routes))
+    logger.info(f"Backfill finished: {sum(job_counts)} jobs.")
+
+
+async def collect_results() -> int:
+    """
+    Uploads the screenshots that capture workers have put on the work queue, and
+    records the jobs they gave up on as failed.
+
+    A result is removed from the queue only after it is recorded in the job journal,
+    so a crash in between loses nothing.
+
+    Returns:
+        int: The number of results collected.
     """
-    # Scrape recent messages from the source chat.
-    messages = await telegramstuff.scrape_message(
-        client, source_chat_id, limit=telegram_limit
+    results = await work_queue.take_results()
+    for job_id, job, filename, image, error in results:
+        if image is None:
+            logger.error(f"Capture failed for job: {job}: {error}")
+            job_journal.mark_failed(job, f"capture: {error}")
+            metrics.increment("jobs_failed")
+        else:
+            job_journal.mark_captured(job, filename, image)
+            await submit_upload(job, filename, image)
+        await work_queue.acknowledge(job_id)
+    return len(results)
+
+
+async def collect_results_periodically() -> None:
+    """Collects the results of the capture workers until cancelled."""
+    while True:
+        if not await collect_results():
+            await asyncio.sleep(Config.WORK_QUEUE_POLL_INTERVAL)
+
+
+async def drain_work_queue() -> None:
+    """
+    Collects the results of the capture workers until every queued job is finished.
+
+    Gives up after every job could have used all its leases, e.g. when no worker is
+    running; the jobs stay queued and their results are collected by the next run.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + Config.WORK_QUEUE_LEASE_SECONDS * Config.WORK_QUEUE_MAX_ATTEMPTS
+    while True:
+        collected = await collect_results()
+        outstanding = await work_queue.outstanding()
+        if not (collected or outstanding):
+            break
+        if loop.time() >= deadline:
+            logger.warning(
+                f"{outstanding} jobs are still with the capture workers; "
+                "their results are collected by the next run."
+            )
+            break
+        await asyncio.sleep(Config.WORK_QUEUE_POLL_INTERVAL)
+    await upload_queue.join()
+
+
+async def run_worker() -> None:
+    """
+    Captures jobs from the work queue until cancelled, without a Telegram session.
+
+    `Config.WORKER_COUNT` jobs are leased and captured at the same time. A job
+    whose capture fails is returned to the queue for another attempt; a job whose
+    worker dies is handed out again once its lease expires.
+    """
+    queue = open_work_queue()
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def capture_loop(number: int) -> None:
+        """Leases and captures one job at a time."""
+        name = f"{worker_name}/{number}"
+        while True:
+            # A remote queue may be unreachable for a while, e.g. while the ingestor restarts.
+            try:
+                leased = await queue.lease(name)
+            except OSError as e:
+                logger.warning(f"Could not lease a job from the work queue: {e}")
+                leased = None
+            if leased is None:
+                await asyncio.sleep(Config.WORK_QUEUE_POLL_INTERVAL)
+                continue
+            job_id, job = leased
+            logger.info(f"Capturing job {job_id}: {job}")
+            filename = screenshot_filename(job["task_number"])
+            try:
+                image = await capture_job(job, filename)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Capture of job {job_id} failed: {e}")
+                metrics.increment("captures_failed")
+                report = queue.fail(job_id, name, str(e))
+            else:
+                metrics.increment("captures_succeeded")
+                report = queue.complete(job_id, name, filename, image)
+            try:
+                await report
+            except OSError as e:
+                logger.warning(
+                    f"Could not report job {job_id} to the work queue, it is handed out "
+                    f"again when its lease expires: {e}"
+                )
+                await asyncio.sleep(Config.WORK_QUEUE_POLL_INTERVAL)
+
+    background_tasks = []
+    if Config.MEMORY_REPORT_INTERVAL:
+        background_tasks.append(
+            asyncio.create_task(report_memory_periodically(Config.MEMORY_REPORT_INTERVAL))
+        )
+    logger.info(f"Capture worker {worker_name} started with {Config.WORKER_COUNT} slots.")
+    try:
+        await asyncio.gather(*(capture_loop(number) for number in range(Config.WORKER_COUNT)))
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        if browser_pool is not None:
+            await browser_pool.close()
+
+
+async def run_daemon() -> None:
+    """
+    Keeps the Telegram client connected and polls the source chats from an
+    in-process scheduler instead of cron.
+
+    Within `Config.ACTIVE_HOURS`, each route's source chat is polled every
+    `poll_interval` seconds (`Config.POLL_INTERVAL` by default), starting with a
+    catch-up of the messages posted while the daemon was not running. A
+    `NewMessage` handler makes a source chat due as soon as a message is posted
+    in it, so new jobs are picked up within seconds. Outside the active hours,
+    nothing is polled; the first poll of the next active hour catches up.
+
+    The configuration is reloaded on SIGHUP and whenever the .env file or the
+    routes file changes; the scheduler and the handler always use the current routes.
+    """
+    from telethon import events  # pylint: disable=import-outside-toplevel
+
+    # Background tasks are kept referenced for as long as the daemon runs.
+    background_tasks = []
+    if Config.METRICS_PORT:
+        await serve_metrics(Config.METRICS_PORT)
+    if Config.METRICS_FILE:
+        background_tasks.append(
+            asyncio.create_task(
+                dump_metrics_periodically(Config.METRICS_FILE, Config.METRICS_DUMP_INTERVAL)
+            )
+        )
+
+    if Config.MEMORY_REPORT_INTERVAL:
+        background_tasks.append(
+            asyncio.create_task(report_memory_periodically(Config.MEMORY_REPORT_INTERVAL))
+        )
+    background_tasks.append(asyncio.create_task(watch_config(Config.CONFIG_WATCH_INTERVAL)))
+    if work_queue is not None:
+        background_tasks.append(asyncio.create_task(collect_results_periodically()))
+    # SIGHUP also re-reads the routes file, even if its modification time is unchanged.
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGHUP, lambda: Config.reload(also_changed={"ROUTES_FILE"})
     )
-    logger.debug(f"Message List: {messages}")
 
-    # Extract job information from the scraped messages.
-    jobs = extract_jobs_from_messages(messages)
+    def route_for(chat_id: int) -> Route | None:
+        """Returns the current route of a source chat."""
+        return next((route for route in routes if route.source_chat_id == chat_id), None)
+
+    async def poll(chat_id: int) -> None:
+        """Processes the new jobs of a source chat, if it still has a route."""
+        route = route_for(chat_id)
+        if route is not None:
+            await process_route(route)
+
+    # The scheduler never polls a chat twice at the same time, so polls and new
+    # messages of the same chat cannot process a job twice.
+    scheduler = Scheduler(
+        lambda: {
+            route.source_chat_id: route.poll_interval or Config.POLL_INTERVAL for route in routes
+        },
+        poll,
+    )
 
-    logger.info(f"Found {len(jobs)} jobs.")
-    logger.debug(f"Jobs: {jobs}")
+    # The chats are filtered in the handler, so that reloaded routes apply immediately.
+    @client.on(events.NewMessage())
+    async def handle_new_message(event):
+        """Polls a source chat as soon as a message is posted in it."""
+        if event.message.text and route_for(event.chat_id) is not None:
+            logger.debug("New message %s in %s", event.message.id, event.chat_id)
+            scheduler.trigger(event.chat_id)
 
-    if not jobs:
-        logger.warning("No jobs found in the latest messages.")
-        return
+    await resume_jobs()
+    background_tasks.append(asyncio.create_task(scheduler.run()))
+
+    sources = [route.source_chat_id for route in routes]
+    logger.info(f"Daemon mode: polling and listening for new messages in {sources}...")
+    try:
+        await client.run_until_disconnected()
+    finally:
+        for task in background_tasks:
+            task.cancel()
 
-    # The script is designed to process only the most recent job found.
-    # `scrape_message` returns messages in descending order, so the first job in the list is the newest.
-    job = jobs[0]
-    await process_job(job, client, destination_chat_id)
 
+def start_profiler(loop: asyncio.AbstractEventLoop):
+    """Starts sampling the event loop's thread and tasks for `--profile`."""
+    from profiler import SamplingProfiler  # pylint: disable=import-outside-toplevel
 
-if __name__ == "__main__":
-    # Introduce a random delay before starting to mimic more human-like behavior.
-    random_sleep(wait_min, wait_max)
+    profiler = SamplingProfiler()
+    profiler.start(loop)
+    logger.info("Profiling the run...")
+    return profiler
+
+
+def write_profile(profiler) -> None:
+    """Stops the profiler and writes its results next to the log file."""
+    profiler.stop()
+    stem = os.path.join(
+        os.path.dirname(os.path.abspath(Config.LOG_FILE)),
+        f"profile_{datetime.now().strftime('%y%m%d_%H%M%S')}",
+    )
+    profiler.write_collapsed(f"{stem}.collapsed")
+    summary = profiler.summary()
+    with open(f"{stem}.txt", "w", encoding="utf-8") as summary_file:
+        summary_file.write(summary + "\n")
+    logger.info(f"Profile written to {stem}.collapsed and {stem}.txt:\n{summary}")
 
-    # Initialize and connect the Telegram client.
-    logger.info("Initializing Telegram client...")
-    client = TelegramClient("telegram", Config.API_ID, Config.API_HASH)
 
-    with client:
+def run_worker_process() -> None:
+    """Runs a capture worker (`--role worker`) until it is interrupted."""
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log_memory_usage()
+        logger.info(f"Run summary: {metrics.summary()}")
+        if Config.METRICS_FILE:
+            metrics.dump(Config.METRICS_FILE)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    load_config(args.env_file)
+    if args.role == "worker":
+        # Capture workers never connect to Telegram.
+        run_worker_process()
+        sys.exit()
+
+    dry_run = args.dry_run
+    if args.messages_file:
+        # Recorded messages stand in for Telegram, so nothing connects to it.
+        client = telegramstuff.RecordedMessagesClient(
+            telegramstuff.load_message_fixtures(args.messages_file)
+        )
+        connection = contextlib.nullcontext()
+        loop = asyncio.new_event_loop()
+    else:
+        from telethon.sync import TelegramClient  # pylint: disable=import-outside-toplevel
+
+        # Initialize and connect the Telegram client.
+        logger.info("Initializing Telegram client...")
+        client = TelegramClient("telegram", Config.API_ID, Config.API_HASH)
+        connection = client
+        loop = client.loop
+    routes = load_routes()
+    Config.subscribe(on_config_change)
+    # A dry run keeps its state in memory, so the next real run still processes the jobs.
+    db_path = ":memory:" if args.dry_run else Config.STATE_DB_PATH
+    state_store = StateStore(db_path)
+    job_ledger = JobLedger(db_path, Config.LEDGER_TTL_DAYS * 24 * 60 * 60)
+    job_journal = JobJournal(db_path, Config.LEDGER_TTL_DAYS * 24 * 60 * 60)
+    upload_queue = telegramstuff.UploadQueue(
+        client,
+        senders=Config.TELEGRAM_CONCURRENCY,
+        max_size=Config.UPLOAD_QUEUE_SIZE,
+        albums=Config.UPLOAD_ALBUMS,
+        dry_run=args.dry_run,
+    )
+    if args.role == "ingestor":
+        work_queue = SqliteWorkQueue(
+            Config.WORK_QUEUE_DB_PATH or Config.STATE_DB_PATH,
+            Config.WORK_QUEUE_LEASE_SECONDS,
+            Config.WORK_QUEUE_MAX_ATTEMPTS,
+        )
+
+    with connection:
+        profiler = start_profiler(loop) if args.profile else None
+        work_queue_server = None
         # Run the main asynchronous event loop.
-        client.loop.run_until_complete(main())
+        try:
+            if work_queue is not None and Config.WORK_QUEUE_PORT:
+                # Served in every mode, so remote workers can also finish the jobs of a cron run.
+                work_queue_server = loop.run_until_complete(
+                    serve_work_queue(
+                        work_queue,
+                        Config.WORK_QUEUE_PORT,
+                        Config.WORK_QUEUE_TOKEN,
+                        Config.WORK_QUEUE_HOST,
+                    )
+                )
+            if args.daemon:
+                loop.run_until_complete(run_daemon())
+            elif args.backfill is not None:
+                loop.run_until_complete(run_backfill(args.backfill))
+            else:
+                if not (args.profile or args.dry_run):
+                    # Introduce a random delay before starting to mimic more human-like behavior.
+                    loop.run_until_complete(random_delay(Config.WAIT_MIN, Config.WAIT_MAX))
+                loop.run_until_complete(main())
+            if work_queue is not None and not args.daemon:
+                # Wait for the workers, so that this run uploads what it enqueued.
+                loop.run_until_complete(drain_work_queue())
+        finally:
+            if work_queue_server is not None:
+                work_queue_server.close()
+            try:
+                # Measured before the browser is closed, to include its memory.
+                log_memory_usage()
+            finally:
+                loop.run_until_complete(upload_queue.close())
+                if browser_pool is not None:
+                    loop.run_until_complete(browser_pool.close())
+            if profiler is not None:
+                write_profile(profiler)
+            logger.info(f"Run summary: {metrics.summary()}")
+            if Config.METRICS_FILE:
+                metrics.dump(Config.METRICS_FILE)
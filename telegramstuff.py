@@ -1,60 +1,422 @@
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+from types import SimpleNamespace
+
+from telethon import errors
+
+from artifact_store import content_digest, get_artifact_store
 from logger_config import logger
+from metrics import metrics
 
-from telethon.sync import TelegramClient
 from config import Config
 
+# Telegram allows at most 10 media per album.
+MAX_ALBUM_SIZE = 10
+
+# Errors raised when a re-used file reference is no longer accepted by Telegram.
+FILE_REFERENCE_ERRORS = (errors.FileReferenceExpiredError, errors.FileReferenceInvalidError)
+
+# Errors that are worth retrying after a backoff; every other RPC error is permanent.
+TRANSIENT_ERRORS = (
+    errors.ServerError,
+    errors.TimedOutError,
+    ConnectionError,
+    asyncio.TimeoutError,
+)
+
+
+def _open_picture(filename: str, data: bytes | None):
+    """Returns the file to upload: a named buffer for in-memory images, a path otherwise."""
+    if data is None:
+        return f"./png/{filename}"
+    # Telethon derives the file type from the buffer's name.
+    file = BytesIO(data)
+    file.name = filename
+    return file
+
+
+def _remember_sent_media(store, digests: list, messages: list) -> None:
+    """Records the media of sent messages, so the same images can be re-sent by reference."""
+    for digest, message in zip(digests, messages):
+        media = getattr(message, "photo", None) or getattr(message, "document", None)
+        if digest and media:
+            store.remember_media_ref(digest, media)
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Returns the exponential backoff delay with full jitter for an attempt (1-based)."""
+    delay = min(Config.UPLOAD_BACKOFF_MAX, Config.UPLOAD_BACKOFF_BASE * 2 ** (attempt - 1))
+    return random.uniform(0, delay)
+
 
-async def send_picture(client, destination_chat_id, filename: str, caption: str) -> bool:
+async def _send_with_retry(client, destination_chat_id, pictures: list, label: str) -> bool:
+    """
+    Sends one picture or an album, retrying transient errors.
+
+    FloodWait errors are honoured by sleeping for the duration Telegram asks for,
+    as long as it does not exceed `Config.UPLOAD_MAX_FLOOD_WAIT`. Transient network
+    and server errors are retried with exponential backoff and jitter. Any other
+    error is permanent and fails the upload immediately.
+
+    An image that was sent recently is sent by reference to the uploaded file instead
+    of being uploaded again; if Telegram rejects the reference, the image is uploaded.
+
+    Args:
+        client: The Telegram client instance used to send the file.
+        destination_chat_id (int or str): The ID or username of the destination chat.
+        pictures (list): (filename, caption, data) tuples; more than one is sent as an album.
+        label (str): A description of the upload for log messages.
+
+    Returns:
+        bool: True if the upload succeeded, False otherwise.
+    """
+    store = get_artifact_store()
+    digests = [content_digest(data) if data is not None else None for _, _, data in pictures]
+    for attempt in range(1, Config.UPLOAD_MAX_ATTEMPTS + 1):
+        # Buffers are consumed by an upload, so they are re-created for every attempt.
+        files = []
+        for (filename, _, data), digest in zip(pictures, digests):
+            media = store.get_media_ref(digest) if digest else None
+            if media is not None:
+                metrics.increment("uploads_by_reference")
+                files.append(media)
+            else:
+                files.append(_open_picture(filename, data))
+        captions = [caption for _, caption, _ in pictures]
+        if attempt > 1:
+            metrics.increment("upload_retries")
+        try:
+            with metrics.timer("upload"):
+                if len(files) == 1:
+                    messages = [
+                        await client.send_file(
+                            destination_chat_id, files[0], caption=captions[0]
+                        )
+                    ]
+                else:
+                    messages = await client.send_file(
+                        destination_chat_id, files, caption=captions
+                    )
+            _remember_sent_media(store, digests, messages)
+            return True
+        except FILE_REFERENCE_ERRORS as e:
+            logger.info(f"Re-used file of {label} was rejected ({e!r}), uploading it again.")
+            for digest in digests:
+                if digest:
+                    store.forget_media_ref(digest)
+        except (errors.FloodWaitError, errors.SlowModeWaitError) as e:
+            metrics.increment("flood_waits")
+            if e.seconds > Config.UPLOAD_MAX_FLOOD_WAIT:
+                logger.error(
+                    f"Telegram asked to wait {e.seconds} s before sending {label}, giving up."
+                )
+                return False
+            logger.warning(
+                f"Flood wait while sending {label}: sleeping {e.seconds} s "
+                f"(attempt {attempt}/{Config.UPLOAD_MAX_ATTEMPTS})."
+            )
+            await asyncio.sleep(e.seconds + 1)
+        except TRANSIENT_ERRORS as e:
+            delay = _backoff_delay(attempt)
+            logger.warning(
+                f"Error sending {label}: {e!r}. Retrying in {delay:.1f} s "
+                f"(attempt {attempt}/{Config.UPLOAD_MAX_ATTEMPTS})."
+            )
+            await asyncio.sleep(delay)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error(f"Error sending {label}: {e!r}. Not retrying.")
+            return False
+    logger.error(f"Giving up sending {label} after {Config.UPLOAD_MAX_ATTEMPTS} attempts.")
+    return False
+
+
+async def send_picture(
+    client, destination_chat_id, filename: str, caption: str, data: bytes | None = None
+) -> bool:
     """
     Asynchronously sends a picture to a specified chat.
 
     Args:
         client: The Telegram client instance used to send the file.
         destination_chat_id (int or str): The ID or username of the destination chat.
-        filename (str): The path to the file to send.
+        filename (str): The name of the file in the png directory.
         caption (str): The caption for the picture.
+        data (bytes, optional): The image itself. When given, it is uploaded from memory
+            instead of being read from the png directory.
 
     Returns:
         bool: True if the picture was sent successfully, False otherwise.
 
     """
-    for i in range(2):
-        try:
-            await client.send_file(
-                destination_chat_id, f"./png/{filename}", caption=caption
-            )
+    sent = await _send_with_retry(
+        client, destination_chat_id, [(filename, caption, data)], f"screenshot {filename}"
+    )
+    if sent:
+        size = len(data) if data is not None else os.path.getsize(f"./png/{filename}")
+        logger.info(f"Screenshot sent: {filename} ({size} bytes) to {destination_chat_id}")
+    return sent
 
-            logger.info(
-                f"Screenshot sent: {filename} to {destination_chat_id}"
-            )
-            return True
-            # only the last received job should be executed
-            break
-        except Exception as e:
-            logger.error(f"Error sending screenshot {filename}: {e}")
-    return False
+
+async def send_album(client, destination_chat_id, pictures: list) -> bool:
+    """
+    Asynchronously sends several pictures to a chat as one album.
+
+    Args:
+        client: The Telegram client instance used to send the files.
+        destination_chat_id (int or str): The ID or username of the destination chat.
+        pictures (list): Up to 10 (filename, caption, data) tuples, see `send_picture`.
+
+    Returns:
+        bool: True if the album was sent successfully, False otherwise.
+    """
+    filenames = ", ".join(filename for filename, _, _ in pictures)
+    sent = await _send_with_retry(
+        client, destination_chat_id, pictures, f"album [{filenames}]"
+    )
+    if sent:
+        logger.info(f"Album sent: {filenames} to {destination_chat_id}")
+    return sent
 
 
-async def scrape_message(client, channel, limit=50):
+class UploadQueue:
     """
-    Scrape messages from a specified Telegram channel.
+    A bounded outbound queue that sends screenshots over the shared Telegram client.
 
-    This function uses an asynchronous Telegram client to iterate through messages
-    in a given channel and collects the text of each message up to a specified limit.
+    Capture workers `submit` screenshots and continue with the next job; a fixed
+    number of sender tasks upload them in the background and report the outcome
+    through a callback. If album batching is enabled, screenshots for the same
+    chat that are waiting at the same time are sent as one album.
+    """
+
+    def __init__(
+        self, client, senders: int, max_size: int, albums: bool = False, dry_run: bool = False
+    ):
+        """Initializes the queue; the sender tasks are started on first submit.
+
+        Args:
+            client: The Telegram client instance used to send the files.
+            senders (int): The number of concurrent uploads.
+            max_size (int): The maximum number of waiting screenshots; `submit` blocks when full.
+            albums (bool, optional): Send waiting screenshots as albums. Defaults to False.
+            dry_run (bool, optional): Log the screenshots and report them as sent instead
+                of uploading them. Defaults to False.
+        """
+        self.client = client
+        self.senders = max(1, senders)
+        self.albums = albums
+        self.dry_run = dry_run
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_size))
+        self._tasks: list[asyncio.Task] = []
+
+    async def submit(
+        self, destination_chat_id, filename: str, caption: str, data: bytes | None, on_done
+    ) -> None:
+        """
+        Queues a screenshot for upload.
+
+        Args:
+            destination_chat_id (int or str): The ID or username of the destination chat.
+            filename (str): The name of the file.
+            caption (str): The caption for the picture.
+            data (bytes | None): The image, or None to read it from the png directory.
+            on_done: An async callable that receives True if the upload succeeded, False otherwise.
+        """
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._sender(i)) for i in range(self.senders)
+            ]
+        await self._queue.put((destination_chat_id, (filename, caption, data), on_done))
+
+    def _take_batch(self, first: tuple) -> list:
+        """Takes the screenshots that are already waiting to be sent along with `first`."""
+        batch = [first]
+        while self.albums and len(batch) < MAX_ALBUM_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _sender(self, sender_id: int) -> None:
+        """Sends queued screenshots until cancelled."""
+        while True:
+            batch = self._take_batch(await self._queue.get())
+            try:
+                by_chat: dict = {}
+                for destination_chat_id, picture, on_done in batch:
+                    by_chat.setdefault(destination_chat_id, []).append((picture, on_done))
+                for destination_chat_id, items in by_chat.items():
+                    pictures = [picture for picture, _ in items]
+                    if self.dry_run:
+                        logger.info(
+                            f"Dry run: not sending {[name for name, _, _ in pictures]} "
+                            f"to {destination_chat_id}"
+                        )
+                        sent = True
+                    elif len(pictures) == 1:
+                        sent = await send_picture(self.client, destination_chat_id, *pictures[0])
+                    else:
+                        sent = await send_album(self.client, destination_chat_id, pictures)
+                    for _, on_done in items:
+                        await on_done(sent)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Upload sender {sender_id}: unexpected error: {e!r}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def join(self) -> None:
+        """Waits until every queued screenshot has been sent (or has failed)."""
+        await self._queue.join()
+
+    async def close(self) -> None:
+        """Sends the remaining screenshots and stops the sender tasks."""
+        await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def load_message_fixtures(path: str) -> list[str]:
+    """
+    Reads recorded message texts to run the pipeline against instead of Telegram.
+
+    Args:
+        path (str): A JSON file with a list of messages, oldest first; each is a text
+            or an object with a "text", like the records of `iter_message_records`.
+
+    Returns:
+        list: The message texts, oldest first.
+    """
+    with open(path, encoding="utf-8") as fixtures:
+        messages = json.load(fixtures)
+    return [message if isinstance(message, str) else message["text"] for message in messages]
+
+
+class RecordedMessagesClient:
+    """
+    Serves a fixed message history through the part of the Telethon client API the
+    pipeline reads with (`iter_messages`, `get_messages`, `on`).
+
+    Used with `--messages-file` together with a dry-run `UploadQueue`, which never
+    sends, so the parse and capture paths run without a Telegram session.
+    """
+
+    def __init__(self, texts: list[str]):
+        """Initializes the client with a message history.
+
+        Args:
+            texts (list): The message texts, oldest first; message IDs start at 1.
+        """
+        now = datetime.now(timezone.utc)
+        self.messages = [
+            SimpleNamespace(id=message_id, text=text, date=now)
+            for message_id, text in enumerate(texts, start=1)
+        ]
+
+    async def _wait_for_fetch(self) -> None:
+        """Called before every 100 messages are served; subclasses may add latency."""
+
+    async def iter_messages(self, _entity, limit=None, min_id=0, reverse=False):
+        """Yields the messages newer than `min_id`, newest first unless `reverse`."""
+        messages = [message for message in self.messages if message.id > min_id]
+        if not reverse:
+            messages.reverse()
+        for index, message in enumerate(messages[:limit]):
+            if index % 100 == 0:
+                await self._wait_for_fetch()
+            yield message
+
+    async def get_messages(self, _entity, limit=100, offset_id=0, offset_date=None, reverse=False):
+        """Returns one batch of the history, like `iter_messages` with offsets."""
+        await self._wait_for_fetch()
+        messages = self.messages
+        if offset_date is not None:
+            messages = [m for m in messages if m.date > offset_date]
+        if reverse:
+            return [m for m in messages if m.id > offset_id][:limit]
+        if offset_id:
+            messages = [m for m in messages if m.id < offset_id]
+        return list(reversed(messages))[:limit]
+
+    def on(self, _event):
+        """Accepts event handlers without ever calling them."""
+        return lambda handler: handler
+
+
+async def iter_message_records(client, channel, limit=50, min_id=0, reverse=False):
+    """
+    Yields messages from a specified Telegram channel as they are downloaded.
+
+    Only messages newer than `min_id` are fetched, so passing the last processed message ID
+    transfers just the messages posted since then. Messages without text are skipped.
 
     Args:
         client (TelegramClient): The Telegram client instance used to interact with the Telegram API.
         channel (str): The name or ID of the Telegram channel to scrape messages from.
-        limit (int, optional): The maximum number of messages to scrape. Defaults to 50.
+        limit (int, optional): The maximum number of messages to fetch. Defaults to 50.
+        min_id (int, optional): Only fetch messages with an ID greater than this. Defaults to 0.
+        reverse (bool, optional): Yield the oldest messages first. Defaults to False.
+
+    Yields:
+        dict: The message "id", "text" and "date".
+    """
+    logger.info(f"Scraping messages from {channel} newer than {min_id}...")
+    # Only the time spent waiting for Telegram counts as fetch time, not the time
+    # the consumer spends on each yielded message.
+    fetch_time = 0.0
+    start = time.perf_counter()
+    try:
+        async for message in client.iter_messages(
+            channel, limit=limit, min_id=min_id, reverse=reverse
+        ):
+            fetch_time += time.perf_counter() - start
+            metrics.increment("messages_fetched")
+            if message.text:
+                logger.debug("%s\n%s", message.text, "-" * 40)
+                yield {"id": message.id, "text": message.text, "date": message.date}
+            start = time.perf_counter()
+    finally:
+        metrics.observe("fetch", fetch_time)
+
+
+async def fetch_history_batch(
+    client, channel, batch_size: int, offset_id: int = 0, offset_date=None
+) -> tuple[list[dict], int]:
+    """
+    Fetches the next batch of a chat's history, oldest message first.
+
+    Args:
+        client (TelegramClient): The Telegram client instance used to interact with the Telegram API.
+        channel (str): The name or ID of the Telegram channel to fetch messages from.
+        batch_size (int): The maximum number of messages to fetch.
+        offset_id (int, optional): Only fetch messages with an ID greater than this.
+        offset_date (datetime, optional): Only fetch messages posted after this; used
+            for the first batch, before a message ID is known.
 
     Returns:
-        list: A list of message texts scraped from the specified channel.
-    """
-    logger.info(f"Scraping messages from {channel}...")
-    messages = []
-    async for message in client.iter_messages(channel, limit=limit):
-        if message.text:
-            logger.debug(message.text)
-            logger.debug("-" * 40)
-            messages.append(message.text)
-    return messages
+        tuple: The records ("id", "text" and "date") of the messages with text, and the
+        highest message ID in the batch, or `offset_id` if the batch is empty.
+    """
+    with metrics.timer("fetch"):
+        messages = await client.get_messages(
+            channel,
+            limit=batch_size,
+            offset_id=offset_id,
+            offset_date=offset_date,
+            reverse=True,
+        )
+    metrics.increment("messages_fetched", len(messages))
+    records = [
+        {"id": message.id, "text": message.text, "date": message.date}
+        for message in messages
+        if message.text
+    ]
+    last_id = max((message.id for message in messages), default=offset_id)
+    return records, last_id
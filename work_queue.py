@@ -0,0 +1,383 @@
+"""This module provides the durable work queue between the ingestor, which owns the
+Telegram session, and the capture workers, which run Chromium.
+
+The queue lives in SQLite (`SqliteWorkQueue`). Workers on the same host use the
+database directly; workers on other hosts reach it through the HTTP server the
+ingestor runs (`serve_work_queue`) with `HttpWorkQueue`. Both expose the same
+worker API: `enqueue`, `lease`, `complete` and `fail`.
+"""
+
+import asyncio
+import base64
+import hmac
+import json
+import sqlite3
+import threading
+import time
+import urllib.request
+
+from config import Config
+from job_ledger import job_key
+from logger_config import logger
+
+# The states of a queued job; "done" and "failed" are waiting to be collected by the ingestor.
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class SqliteWorkQueue:
+    """
+    A job queue in SQLite with leases and re-delivery.
+
+    A worker leases the oldest pending job for `lease_seconds`. If it neither
+    completes nor fails the job in that time, e.g. because it died, the lease
+    expires and the job is handed to the next worker; the late result of the
+    first worker is then ignored. A job is given up after `max_attempts` leases.
+    Leasing runs in an immediate transaction, so several worker processes can
+    share the database file.
+
+    The database is accessed in a thread, one call at a time, so a busy database
+    never blocks the event loop.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float, max_attempts: int):
+        """Opens (or creates) the queue.
+
+        Args:
+            db_path (str): The path to the SQLite database file.
+            lease_seconds (float): How long a worker may hold a job.
+            max_attempts (int): How many times a job is leased before it fails.
+        """
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            db_path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS work_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_key TEXT NOT NULL UNIQUE,
+                job TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_expires REAL,
+                filename TEXT,
+                image BLOB,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS work_queue_state ON work_queue (state, id)"
+        )
+
+    async def _run(self, function, *args):
+        """Runs a database function in a thread, one at a time."""
+
+        def locked():
+            with self._lock:
+                return function(*args)
+
+        return await asyncio.to_thread(locked)
+
+    async def enqueue(self, job: dict) -> None:
+        """Adds a job; a job that is already queued is not added twice."""
+        key = json.dumps(job_key(job["source_chat_id"], job))
+        await self._run(
+            self.connection.execute,
+            "INSERT OR IGNORE INTO work_queue (job_key, job, state, updated_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, json.dumps(job, default=str), PENDING, time.time()),
+        )
+
+    async def lease(self, worker: str) -> tuple[int, dict] | None:
+        """
+        Leases the oldest job that is pending or whose lease has expired.
+
+        Args:
+            worker (str): The name of the worker; only this worker can complete or
+                fail the job while it holds the lease.
+
+        Returns:
+            tuple | None: The job ID and the job, or None if there is nothing to do.
+        """
+        return await self._run(self._lease, worker)
+
+    def _lease(self, worker: str) -> tuple[int, dict] | None:
+        """See `lease`."""
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = self.connection.execute(
+                    """
+                    SELECT id, job, attempts, worker FROM work_queue
+                    WHERE state = ? OR (state = ? AND lease_expires < ?)
+                    ORDER BY id LIMIT 1
+                    """,
+                    (PENDING, LEASED, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id, job, attempts, previous_worker = row
+                if attempts >= self.max_attempts:
+                    self.connection.execute(
+                        "UPDATE work_queue SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+                        (FAILED, f"lease of {previous_worker} expired", now, job_id),
+                    )
+                    continue
+                if previous_worker:
+                    logger.warning(f"Re-delivering job {job_id}, leased by {previous_worker}.")
+                self.connection.execute(
+                    """
+                    UPDATE work_queue SET state = ?, worker = ?, lease_expires = ?,
+                        attempts = attempts + 1, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (LEASED, worker, now + self.lease_seconds, now, job_id),
+                )
+                return job_id, json.loads(job)
+        finally:
+            self.connection.execute("COMMIT")
+
+    async def complete(self, job_id: int, worker: str, filename: str, image: bytes) -> None:
+        """Stores the screenshot of a leased job for the ingestor to upload.
+
+        The result is ignored unless `worker` still holds the lease of the job.
+        """
+        changed = await self._run(
+            lambda: self.connection.execute(
+                "UPDATE work_queue SET state = ?, filename = ?, image = ?, updated_at = ? "
+                "WHERE id = ? AND state = ? AND worker = ?",
+                (DONE, filename, image, time.time(), job_id, LEASED, worker),
+            ).rowcount
+        )
+        if not changed:
+            logger.warning(f"Ignoring the result of job {job_id}: {worker} lost its lease.")
+
+    async def fail(self, job_id: int, worker: str, error: str) -> None:
+        """Returns a leased job to the queue, or fails it after `max_attempts` leases.
+
+        The failure is ignored unless `worker` still holds the lease of the job.
+        """
+        changed = await self._run(
+            lambda: self.connection.execute(
+                """
+                UPDATE work_queue
+                SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                    error = ?, worker = NULL, updated_at = ?
+                WHERE id = ? AND state = ? AND worker = ?
+                """,
+                (self.max_attempts, FAILED, PENDING, error, time.time(), job_id, LEASED, worker),
+            ).rowcount
+        )
+        if not changed:
+            logger.warning(f"Ignoring the failure of job {job_id}: {worker} lost its lease.")
+
+    async def take_results(self, limit: int = 100) -> list[tuple]:
+        """
+        Returns the jobs that workers have completed or that failed.
+
+        The results stay in the queue until they are acknowledged with `acknowledge`,
+        so a crash of the ingestor does not lose them.
+
+        Returns:
+            list: (job ID, job, filename, image, error) tuples; the image is None
+            for failed jobs.
+        """
+        rows = await self._run(
+            lambda: self.connection.execute(
+                "SELECT id, job, filename, image, error FROM work_queue "
+                "WHERE state IN (?, ?) ORDER BY id LIMIT ?",
+                (DONE, FAILED, limit),
+            ).fetchall()
+        )
+        return [
+            (job_id, json.loads(job), filename, image, error)
+            for job_id, job, filename, image, error in rows
+        ]
+
+    async def outstanding(self) -> int:
+        """Returns the number of jobs that are pending or leased."""
+        return await self._run(
+            lambda: self.connection.execute(
+                "SELECT COUNT(*) FROM work_queue WHERE state IN (?, ?)", (PENDING, LEASED)
+            ).fetchone()[0]
+        )
+
+    async def acknowledge(self, job_id: int) -> None:
+        """Removes a collected job from the queue."""
+        await self._run(
+            self.connection.execute, "DELETE FROM work_queue WHERE id = ?", (job_id,)
+        )
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            self.connection.close()
+
+
+class HttpWorkQueue:
+    """
+    The worker API of a `SqliteWorkQueue` served by `serve_work_queue` on another host.
+
+    Requests are plain JSON over HTTP, sent with urllib in a thread, and carry the
+    shared token of the server as a bearer token.
+    """
+
+    def __init__(self, base_url: str, token: str, timeout: float = 30):
+        """Initializes the client.
+
+        Args:
+            base_url (str): The URL of the queue server, e.g. "http://10.0.0.2:8765".
+            token (str): The shared secret of the queue server.
+            timeout (float, optional): The timeout of each request, in seconds.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _post_sync(self, path: str, payload: dict) -> dict:
+        """Posts a JSON payload and returns the decoded JSON response."""
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=json.dumps(payload, default=str).encode(),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.token}",
+            },
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read() or b"{}")
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        """Posts a JSON payload without blocking the event loop."""
+        return await asyncio.to_thread(self._post_sync, path, payload)
+
+    async def enqueue(self, job: dict) -> None:
+        """See `SqliteWorkQueue.enqueue`."""
+        await self._post("/enqueue", {"job": job})
+
+    async def lease(self, worker: str) -> tuple[int, dict] | None:
+        """See `SqliteWorkQueue.lease`."""
+        response = await self._post("/lease", {"worker": worker})
+        return (response["id"], response["job"]) if response else None
+
+    async def complete(self, job_id: int, worker: str, filename: str, image: bytes) -> None:
+        """See `SqliteWorkQueue.complete`."""
+        await self._post(
+            "/complete",
+            {
+                "id": job_id,
+                "worker": worker,
+                "filename": filename,
+                "image": base64.b64encode(image).decode(),
+            },
+        )
+
+    async def fail(self, job_id: int, worker: str, error: str) -> None:
+        """See `SqliteWorkQueue.fail`."""
+        await self._post("/fail", {"id": job_id, "worker": worker, "error": error})
+
+
+async def _dispatch(queue: SqliteWorkQueue, path: str, payload: dict) -> dict:
+    """Calls the queue method of a request path and returns the JSON response."""
+    if path == "/enqueue":
+        await queue.enqueue(payload["job"])
+    elif path == "/lease":
+        leased = await queue.lease(payload["worker"])
+        return {"id": leased[0], "job": leased[1]} if leased else {}
+    elif path == "/complete":
+        await queue.complete(
+            payload["id"],
+            payload["worker"],
+            payload["filename"],
+            base64.b64decode(payload["image"]),
+        )
+    elif path == "/fail":
+        await queue.fail(payload["id"], payload["worker"], payload["error"])
+    else:
+        raise KeyError(path)
+    return {}
+
+
+def _response(status: bytes, body: dict) -> bytes:
+    """Builds an HTTP response with a JSON body."""
+    data = json.dumps(body).encode()
+    return (
+        b"HTTP/1.1 " + status + b"\r\n"
+        b"Content-Type: application/json\r\n"
+        + f"Content-Length: {len(data)}\r\n".encode()
+        + b"Connection: close\r\n\r\n"
+        + data
+    )
+
+
+async def serve_work_queue(
+    queue: SqliteWorkQueue, port: int, token: str, host: str = "127.0.0.1"
+):
+    """
+    Serves the worker API of a queue over HTTP, for `HttpWorkQueue` clients.
+
+    Requests without the shared token are rejected, since whoever can lease and
+    complete jobs decides what is uploaded.
+
+    Args:
+        queue (SqliteWorkQueue): The queue to serve.
+        port (int): The port to listen on.
+        token (str): The shared secret that clients send as a bearer token.
+        host (str, optional): The address to listen on. Defaults to localhost.
+
+    Returns:
+        asyncio.Server: The running server.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if not hmac.compare_digest(
+                headers.get("authorization", "").encode(), f"Bearer {token}".encode()
+            ):
+                logger.warning("Rejected a work queue request without a valid token.")
+                writer.write(_response(b"401 Unauthorized", {"error": "invalid token"}))
+                await writer.drain()
+                return
+            content_length = int(headers.get("content-length", 0))
+            payload = json.loads(await reader.readexactly(content_length) or b"{}")
+            try:
+                body = await _dispatch(queue, request_line[1], payload)
+                writer.write(_response(b"200 OK", body))
+            except (IndexError, KeyError, TypeError, ValueError) as e:
+                writer.write(_response(b"400 Bad Request", {"error": repr(e)}))
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.warning(f"Bad work queue request: {e!r}")
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Work queue served on http://{host}:{port}")
+    return server
+
+
+def open_work_queue():
+    """Returns the work queue of a worker: the HTTP client if `Config.WORK_QUEUE_URL`
+    is set, otherwise the SQLite queue itself."""
+    if Config.WORK_QUEUE_URL:
+        return HttpWorkQueue(Config.WORK_QUEUE_URL, Config.WORK_QUEUE_TOKEN)
+    return SqliteWorkQueue(
+        Config.WORK_QUEUE_DB_PATH or Config.STATE_DB_PATH,
+        Config.WORK_QUEUE_LEASE_SECONDS,
+        Config.WORK_QUEUE_MAX_ATTEMPTS,
+    )
@@ -1,6 +1,5 @@
 import os.path
 import re
-import token
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials